@@ -0,0 +1,189 @@
+import asyncio
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+# Slot priorities: lower runs first
+PRIORITY_DIRECT = 0
+PRIORITY_AGENT = 1
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; retry_after is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: ``burst`` requests at once, refilled at ``rate`` per second"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client_id -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, client_id: str) -> float:
+        """Take a token; returns 0 when allowed, otherwise the seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client_id, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client_id] = (tokens, now)
+            # Least recently seen clients are forgotten first (they come back with a full bucket)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class _Waiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.state = "waiting"  # -> "granted" | "abandoned", changed under the controller lock
+
+
+class AdmissionController:
+    """Bounded, priority-ordered pool of LLM run slots.
+
+    At most ``max_concurrent`` answers hold a slot at once. Others wait in a
+    priority queue (direct answers ahead of agent runs) of at most
+    ``max_queue`` entries, for at most ``queue_timeout`` seconds. Beyond that
+    requests are rejected with Overloaded straight away rather than piling up.
+    Waiters may sit on different event loops (Flask's background loop and the
+    ASGI server's), so the bookkeeping is guarded by a thread lock.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, queue_timeout: float = 10.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._queue = []  # heap of (priority, sequence, waiter)
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        # Smoothed slot hold time, used for Retry-After hints
+        self._hold_seconds = 5.0
+        self._stats = {"admitted": 0, "queued": 0, "rejected_full": 0, "rejected_timeout": 0}
+
+    def _retry_after(self) -> float:
+        # Called with self._lock held: time for the queue ahead to drain
+        return self._hold_seconds * (self._queued + 1) / self.max_concurrent
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return
+            if self._queued >= self.max_queue:
+                self._stats["rejected_full"] += 1
+                raise Overloaded("admission queue is full", self._retry_after())
+            waiter = _Waiter(loop)
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self._queued += 1
+            self._stats["queued"] += 1
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if waiter.state == "granted":
+                    # The slot arrived as we gave up
+                    if isinstance(e, asyncio.CancelledError):
+                        self._release_locked()
+                        raise
+                    return
+                waiter.state = "abandoned"
+                self._queued -= 1
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self._stats["rejected_timeout"] += 1
+                raise Overloaded("timed out waiting for a free slot", self._retry_after())
+
+    def _release_locked(self) -> None:
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if waiter.state != "waiting":
+                continue
+            # Hand the slot straight to the next waiter; _active stays the same
+            waiter.state = "granted"
+            self._queued -= 1
+            self._stats["admitted"] += 1
+            waiter.loop.call_soon_threadsafe(self._wake, waiter.future)
+            return
+        self._active -= 1
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def release(self, held_seconds: float) -> None:
+        with self._lock:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held_seconds
+            self._release_locked()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, timeout: Optional[float] = None):
+        """Hold one slot for the duration of the block"""
+        await self.acquire(priority, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, active=self._active, waiting=self._queued)
+
+
+class _Unlimited:
+    """Stand-in when admission control is disabled"""
+
+    @asynccontextmanager
+    async def slot(self, priority: int, timeout: Optional[float] = None):
+        yield
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+def create_admission_controller(config: Dict[str, Any]):
+    """Build the slot pool from the `admission` config section"""
+    admission_config = config.get('admission', {})
+    if not admission_config.get('enabled', False):
+        return _Unlimited()
+    return AdmissionController(
+        max_concurrent=admission_config.get('max_concurrent_runs', 8),
+        max_queue=admission_config.get('max_queue', 32),
+        queue_timeout=admission_config.get('queue_timeout_seconds', 10),
+    )
+
+
+def create_rate_limiter(config: Dict[str, Any]) -> Optional[TokenBucketLimiter]:
+    """Build the per-client limiter from `admission.rate_limit`, or None when disabled"""
+    rate_config = config.get('admission', {}).get('rate_limit', {})
+    if not rate_config.get('enabled', False):
+        return None
+    return TokenBucketLimiter(
+        rate=rate_config.get('requests_per_minute', 20) / 60,
+        burst=rate_config.get('burst', 10),
+        max_clients=rate_config.get('max_clients', 10000),
+    )
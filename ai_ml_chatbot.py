@@ -1,99 +1,500 @@
 import os
 import sys
 import re
-from typing import List, Dict, Optional, Any
+import queue
+import asyncio
+import functools
+import contextvars
+import threading
+import concurrent.futures
+import time
+from typing import List, Dict, Optional, Any, Iterator
 import yaml
 import json
-import requests
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 from pathlib import Path
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain_groq import ChatGroq
-from langchain.agents import Tool, AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain_community.tools import DuckDuckGoSearchRun, WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from tavily import TavilyClient
-import feedparser
-from gnews import GNews
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import Tool
+from langchain_core.callbacks import BaseCallbackHandler
+from session_store import create_session_store
+from conversation_memory import create_conversation_memory
+from document_store import create_document_store
+from tool_cache import Uncacheable, create_tool_cache
+from singleflight import create_single_flight
+from admission import (Overloaded, PRIORITY_DIRECT, PRIORITY_AGENT,
+                       create_admission_controller, create_rate_limiter)
+from http_client import UpstreamRegistry, CircuitOpenError
+from arxiv_client import ArxivClient, ArxivPaper
+from news_index import NewsIndex, NewsPrefetcher
+from semantic_cache import create_semantic_cache, is_follow_up
+from query_router import QueryRouter, create_query_router
+from topic_filter import create_topic_filter
+from metrics import (RequestTrace, create_request_tracer, get_trace, request_thread, stage, timed_tool,
+                     atimed_tool, LLM_SECONDS, LLM_TOKENS)
+from deadline import (Deadline, current_deadline, get_deadline, bound_tool, abound_tool,
+                      BUDGET_EXHAUSTED_MESSAGE, TOOL_TIMEOUT_MESSAGE)
+
+# Session of the answer being produced; tools read it to stay within the caller's own data
+current_session_id: contextvars.ContextVar = contextvars.ContextVar("current_session_id", default=None)
+
+def _in_request_thread(func, *args, **kwargs):
+    with request_thread():
+        return func(*args, **kwargs)
+
+
+async def run_in_pool(pool: Optional[concurrent.futures.Executor], func, *args, **kwargs):
+    """Run a blocking call in `pool` (None: the event loop's default executor), in the
+    caller's context so the request trace (and its profiler) and deadline follow it"""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        pool, functools.partial(context.run, _in_request_thread, func, *args, **kwargs))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a short blocking call (session store, memory, embedding) in the default executor.
+
+    Network-bound tool backends go to the chatbot's tool pool via run_in_pool
+    instead, so a slow upstream cannot queue every request's history read.
+    """
+    return await run_in_pool(None, func, *args, **kwargs)
+
+@functools.lru_cache(maxsize=None)
+def llm_transport_errors() -> tuple:
+    """Exceptions meaning Groq itself is unreachable or failing: connection errors, timeouts, 5xx"""
+    import httpx
+    errors = (httpx.TransportError,)
+    try:
+        import groq
+    except ImportError:
+        return errors
+    # APITimeoutError is a subclass of APIConnectionError
+    return errors + (groq.APIConnectionError, groq.InternalServerError)
+
+class ToolFailure(str):
+    """Observation standing in for a tool that raised: shown to the agent, but never
+    quoted in a partial answer or counted as a tool result"""
+
+    def __str__(self):
+        # LangChain's async callback manager str()s tool output; keep the type through it
+        return self
+
+def _tool_error_observation(name: str, error: Exception) -> str:
+    return ToolFailure(f"Error: {name} failed ({error}). Try another tool or answer with what you already have.")
+
+def observe_errors(name: str, func):
+    """Turn a sync tool's exception into an observation the agent can read, instead of failing the run"""
+    def guarded(query: str) -> str:
+        try:
+            return func(query)
+        except Exception as e:
+            return _tool_error_observation(name, e)
+    return guarded
+
+def aobserve_errors(name: str, coroutine):
+    """Async variant of observe_errors"""
+    async def guarded(query: str) -> str:
+        try:
+            return await coroutine(query)
+        except Exception as e:
+            return _tool_error_observation(name, e)
+    return guarded
+
+def search_reply(text: str) -> str:
+    """Mark an empty web/Wikipedia search reply so it is returned but never cached"""
+    # LangChain's DuckDuckGo and Wikipedia wrappers answer "No good ... Search Result was found"
+    if not text.strip() or text.startswith("No good "):
+        return Uncacheable(text)
+    return text
+
+class LazyResource:
+    """Builds an expensive client on first use; concurrent first callers share one build.
+
+    The tool backends (Tavily, DuckDuckGo, Wikipedia, GNews) import large
+    dependency trees, so their imports live in the factory and are only paid
+    for once a request actually needs them.
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
 
 class AIMLNewsRetriever:
     """Retrieves AI/ML related news from various sources"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, index: Optional[NewsIndex] = None, upstreams: Optional[UpstreamRegistry] = None,
+                 executor: Optional[concurrent.futures.Executor] = None):
         self.config = config['news']
-        self.gnews = GNews(language='en', country='US', period='1d', max_results=10)
+        # Threads for blocking fetches made from async callers; None means the loop's default executor
+        self.executor = executor
+        # Pooled sessions, retries and circuit breakers for every outbound call
+        self.upstreams = upstreams or UpstreamRegistry(config)
+        arxiv_config = config.get('arxiv', {})
+        self.arxiv = ArxivClient(self.upstreams['arxiv'],
+                                 page_size=arxiv_config.get('page_size', 100),
+                                 request_interval=arxiv_config.get('request_interval_seconds', 3))
+        self.arxiv_categories = arxiv_config.get('categories', ['cs.AI', 'cs.LG', 'cs.CL', 'cs.CV'])
+        self.prefetch_config = config.get('prefetch', {})
+        # Local index kept warm by NewsPrefetcher; live fetches are the fallback on a miss
+        self.index = index
+        self._gnews = LazyResource(self._build_gnews)
+        if os.getenv("CHATBOT_PRELOAD") or not config.get('startup', {}).get('lazy_tools', True):
+            self._gnews.get()
+    
+    def _build_gnews(self):
+        from gnews import GNews
+        # Only fetch articles inside the configured freshness window
+        return GNews(language='en', country='US', period=f"{self.config.get('freshness_hours', 24)}h", max_results=10)
+    
+    @property
+    def gnews(self):
+        """GNews client, built on first use"""
+        return self._gnews.get()
+    
+    def fetch_live_news(self, query: str = None) -> List[Dict]:
+        """Fetch AI/ML news straight from GNews"""
+        if query:
+            # Search for specific AI/ML topics
+            news_items = self.upstreams['gnews'].call(self.gnews.get_news, f"{query} AI OR ML OR artificial intelligence OR machine learning")
+        else:
+            # Get general AI/ML news
+            ai_news = self.upstreams['gnews'].call(self.gnews.get_news, 'artificial intelligence')
+            ml_news = self.upstreams['gnews'].call(self.gnews.get_news, 'machine learning')
+            news_items = ai_news + ml_news
+        
+        # Format news items
+        formatted_news = []
+        for item in news_items:
+            formatted_news.append({
+                'title': item.get('title', ''),
+                'description': item.get('description', ''),
+                'url': item.get('url', ''),
+                'published': item.get('published date', ''),
+                'source': item.get('publisher', {}).get('title', 'Unknown')
+            })
+        
+        return formatted_news
         
     def get_ai_ml_news(self, query: str = None, limit: int = 5) -> List[Dict]:
-        """Get latest AI/ML news"""
-        try:
-            if query:
-                # Search for specific AI/ML topics
-                news_items = self.gnews.get_news(f"{query} AI OR ML OR artificial intelligence OR machine learning")
-            else:
-                # Get general AI/ML news
-                ai_news = self.gnews.get_news('artificial intelligence')
-                ml_news = self.gnews.get_news('machine learning')
-                news_items = ai_news + ml_news
-            
-            # Format news items
-            formatted_news = []
-            for item in news_items[:limit]:
-                formatted_news.append({
-                    'title': item.get('title', ''),
-                    'description': item.get('description', ''),
-                    'url': item.get('url', ''),
-                    'published': item.get('published date', ''),
-                    'source': item.get('publisher', {}).get('title', 'Unknown')
-                })
-            
-            return formatted_news
-        except Exception as e:
-            print(f"Error retrieving news: {e}")
-            return []
+        """Get latest AI/ML news, answering from the local index when it has matches.
+
+        Upstream failures are raised, so callers can tell them from "no news".
+        """
+        if self.index is not None:
+            hits = self.index.search('news', query, limit,
+                                     max_age_seconds=self.config.get('freshness_hours', 24) * 3600)
+            if hits:
+                return [{
+                    'title': row['title'],
+                    'description': row['summary'],
+                    'url': row['url'],
+                    'published': row['published'],
+                    'source': row['source'] or 'Unknown'
+                } for row in hits]
+        
+        news_items = self.fetch_live_news(query)
+        if self.index is not None:
+            self.index.upsert('news', news_items)
+        return news_items[:limit]
     
-    def search_arxiv(self, query: str, max_results: int = 3) -> List[Dict]:
-        """Search arXiv for AI/ML research papers"""
-        try:
-            # Format query for arXiv API
-            arxiv_query = f"cat:cs.AI OR cat:cs.LG OR cat:cs.CL OR cat:cs.CV AND ({query})"
-            url = f"http://export.arxiv.org/api/query?search_query={arxiv_query}&start=0&max_results={max_results}&sortBy=submittedDate&sortOrder=descending"
-            
-            response = requests.get(url)
-            if response.status_code == 200:
-                # Parse the XML response
-                import xml.etree.ElementTree as ET
-                root = ET.fromstring(response.content)
-                
-                papers = []
-                for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-                    title = entry.find('{http://www.w3.org/2005/Atom}title').text.strip()
-                    summary = entry.find('{http://www.w3.org/2005/Atom}summary').text.strip()
-                    link = entry.find('{http://www.w3.org/2005/Atom}id').text
-                    published = entry.find('{http://www.w3.org/2005/Atom}published').text
-                    
-                    papers.append({
-                        'title': title,
-                        'summary': summary[:200] + '...' if len(summary) > 200 else summary,
-                        'url': link,
-                        'published': published,
-                        'source': 'arXiv'
-                    })
-                
-                return papers
-        except Exception as e:
-            print(f"Error searching arXiv: {e}")
+    async def aget_ai_ml_news(self, query: str = None, limit: int = 5) -> List[Dict]:
+        """Async variant of get_ai_ml_news; GNews is blocking so it runs in self.executor"""
+        return await run_in_pool(self.executor, self.get_ai_ml_news, query, limit)
+    
+    def _indexed_papers(self, query: str, max_results: int) -> List[ArxivPaper]:
+        if self.index is None:
             return []
+        hits = self.index.search('paper', query, max_results,
+                                 max_age_seconds=self.prefetch_config.get('paper_max_age_hours', 168) * 3600)
+        return [ArxivPaper(
+            arxiv_id=row['url'].rsplit('/abs/', 1)[-1],
+            title=row['title'],
+            summary=row['summary'],
+            url=row['url'],
+            published=row['published'],
+            updated='',
+            authors=[],
+            categories=[]
+        ) for row in hits]
+    
+    def search_arxiv(self, query: str, max_results: int = 3, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None) -> List[ArxivPaper]:
+        """Search arXiv for AI/ML research papers; upstream failures are raised"""
+        papers = self._indexed_papers(query, max_results) if date_from is None and date_to is None else []
+        if papers:
+            return papers
+        return self.arxiv.search(query, self.arxiv_categories, date_from, date_to, max_results=max_results)
+    
+    async def asearch_arxiv(self, query: str, max_results: int = 3, date_from: Optional[date] = None,
+                            date_to: Optional[date] = None) -> List[ArxivPaper]:
+        """Async variant of search_arxiv"""
+        papers = self._indexed_papers(query, max_results) if date_from is None and date_to is None else []
+        if papers:
+            return papers
+        return await self.arxiv.asearch(query, self.arxiv_categories, date_from, date_to, max_results=max_results)
+
+    def iter_arxiv_category(self, category: str, max_results: int = 50) -> Iterator[ArxivPaper]:
+        """Newest submissions in one arXiv category, streamed page by page for the prefetcher"""
+        return self.arxiv.iter_search(categories=[category], max_results=max_results)
+
+class StreamingAgentCallbackHandler(BaseCallbackHandler):
+    """Pushes agent steps and final-answer tokens onto a queue as they arrive"""
+
+    FINAL_ANSWER_MARKER = "Final Answer:"
+
+    # User-facing progress messages for each tool
+    TOOL_STATUS = {
+        "AI_ML_News_Search": "Searching the latest AI/ML news…",
+        "ArXiv_Research_Search": "Searching arXiv…",
+        "AI_ML_Web_Search": "Searching the web…",
+        "AI_ML_Wikipedia": "Looking it up on Wikipedia…",
+        "AI_ML_Research_Digest": "Searching news, arXiv and the web…",
+        "User_Documents_Search": "Reading your documents…",
+    }
+
+    def __init__(self, emit, direct: bool = False):
+        # emit(event) receives each event dict, e.g. queue.Queue.put
+        self.emit = emit
+        # Direct (non-ReAct) calls have no "Final Answer:" marker, every token is answer text
+        self.direct = direct
+        self._buffer = ""
+        self._answer_started = direct
+
+    def _reset(self):
+        # Every LLM call in the ReAct loop starts a fresh Thought/Action block
+        self._buffer = ""
+        self._answer_started = self.direct
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._reset()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._reset()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self._answer_started:
+            self.emit({"type": "token", "content": token})
+            return
+        # Hold tokens back until the model commits to a final answer
+        self._buffer += token
+        marker_index = self._buffer.find(self.FINAL_ANSWER_MARKER)
+        if marker_index >= 0:
+            self._answer_started = True
+            remainder = self._buffer[marker_index + len(self.FINAL_ANSWER_MARKER):].lstrip()
+            if remainder:
+                self.emit({"type": "token", "content": remainder})
+
+    def on_agent_action(self, action, **kwargs):
+        status = self.TOOL_STATUS.get(action.tool, f"Using {action.tool}…")
+        self.emit({"type": "step", "tool": action.tool, "content": status})
+
+
+class ToolObservationRecorder(BaseCallbackHandler):
+    """Collects tool outputs so a partial answer can be built if the agent is cut off,
+    and the names of the tools that produced them"""
+
+    def __init__(self):
+        self.observations = []
+        self.tool_names = set()
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.tool_names.add((serialized or {}).get("name"))
+
+    def on_tool_end(self, output, **kwargs):
+        # Failure text (exception messages, URLs) is for the agent, not the user
+        if not isinstance(output, ToolFailure):
+            self.observations.append(str(output))
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times each LLM call and counts tokens and agent iterations into the request trace"""
+
+    def __init__(self, trace: RequestTrace, route: str, counter):
+        self.trace = trace
+        self.route = route
+        # counter(text) -> tokens; fallback when the provider reports no usage (e.g. when streaming)
+        self.counter = counter
+        self._started = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), sum(self.counter(prompt) for prompt in prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started, prompt_tokens = self._started.pop(run_id, (None, 0))
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        prompt_tokens = usage.get('prompt_tokens') or prompt_tokens
+        completion_tokens = usage.get('completion_tokens') or sum(
+            self.counter(generation.text) for generations in response.generations for generation in generations
+        )
+        LLM_SECONDS.observe(duration, route=self.route)
+        LLM_TOKENS.inc(prompt_tokens, route=self.route, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, route=self.route, type="completion")
+        self.trace.add_span("llm", started, duration)
+        self.trace.tokens["prompt"] += prompt_tokens
+        self.trace.tokens["completion"] += completion_tokens
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_agent_action(self, action, **kwargs):
+        self.trace.iterations += 1
+
+    def on_agent_finish(self, finish, **kwargs):
+        self.trace.iterations += 1
+
+
+# Intelligent AI/ML prompt that leverages LangChain's decision-making. Built once at
+# import, so every chatbot (and every worker forked from a preloaded master) shares it
+AGENT_PROMPT = PromptTemplate.from_template(
+    """You are an AI/ML specialized chatbot assistant with extensive knowledge about artificial intelligence, machine learning, and data science.
+
+CORE PRINCIPLES:
+1. You specialize ONLY in AI/ML topics. For non-AI/ML questions, politely redirect: "I'm specialized in AI and ML topics only. Please ask questions related to artificial intelligence, machine learning, data science, deep learning, neural networks, or AI/ML research and trends."
+
+2. INTELLIGENT TOOL USAGE - Use your existing knowledge first, then tools only when needed:
+   
+   ANSWER DIRECTLY (no tools) when you have sufficient knowledge about:
+   ✓ Greetings and general conversation
+   ✓ AI/ML definitions and basic concepts (what is AI, ML, neural networks, etc.)
+   ✓ Algorithm explanations (backpropagation, gradient descent, CNNs, RNNs, etc.)
+   ✓ General AI/ML techniques and methodologies
+   ✓ Historical AI/ML information and well-established facts
+   ✓ Programming concepts related to AI/ML (Python libraries, frameworks)
+   ✓ Mathematical foundations (linear algebra, statistics for ML)
+   
+   USE TOOLS when you need current or specific information about:
+   ✓ Latest news: "recent AI developments", "current AI trends", "AI news today"
+   ✓ Research papers: "new research on...", "recent papers about...", "latest studies"
+   ✓ Company updates: "OpenAI latest", "Google AI news", "Microsoft AI updates"
+   ✓ Current events in the AI/ML field
+   ✓ Specific information you don't have in your knowledge base
+   ✓ Real-time developments and breaking news
+
+3. DECISION PROCESS:
+   - First evaluate if the question is AI/ML related
+   - Then assess if you can answer confidently with your existing knowledge
+   - Only use tools if you genuinely need current/additional information
+   - If answering directly, skip straight to Final Answer immediately
+
+Available tools: {tools}
+Tool names: {tool_names}
+
+FORMAT:
+Question: the input question you received
+Thought: I need to think about whether this is AI/ML related and if I can answer with my knowledge or need tools
+Action: [tool name] (ONLY if you need current/additional information)
+Action Input: [search query] (ONLY if using Action)
+Observation: [tool result] (ONLY if using Action)
+Thought: I now have the information needed to provide a comprehensive answer
+Final Answer: [your response to the user]
+
+Previous conversation context:
+{history}
+
+Question: {input}
+{agent_scratchpad}"""
+)
 
 class AIMLChatbot:
     """AI/ML specialized chatbot with LangChain native decision-making"""
     
-    def __init__(self, config_path: str = "config.yaml"):
+    OFF_TOPIC_MESSAGE = "I'm specialized in AI and ML topics only. Please ask questions related to artificial intelligence, machine learning, data science, or AI/ML research and trends."
+    SERVICE_UNAVAILABLE_MESSAGE = "I apologize, but the AI service is temporarily unavailable. This is a temporary issue and should be resolved shortly. Please try again in a few moments."
+    ERROR_MESSAGE = "I encountered an error processing your query. Could you please try again?"
+    TIMEOUT_MESSAGE = "I couldn't finish answering within the time limit. Please try again or ask a more specific question."
+    PARTIAL_ANSWER_PREFIX = "I ran out of time before finishing my answer. Here is what I found so far:"
+    # Output AgentExecutor returns with early_stopping_method="force"
+    AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+    # Session-scoped tool; answers that used it are never shared through the semantic cache
+    DOCUMENTS_TOOL = "User_Documents_Search"
+    OVERLOADED_MESSAGE = "I'm handling a lot of questions right now. Please try again in a few seconds."
+    
+    def __init__(self, config_path: str = "config.yaml", llm=None, tool_overrides: Optional[Dict[str, tuple]] = None):
+        """llm and tool_overrides (tool name -> (func, coroutine)) replace the Groq model
+        and tool backends, e.g. with the offline stand-ins in benchmarks/"""
         self.config = self._load_config(config_path)
-        self.memory = {"chat_history": [], "user_name": None}
-        self.news_retriever = AIMLNewsRetriever(self.config)
+        self._llm_override = llm
+        self.tool_overrides = tool_overrides or {}
+        # Conversation history lives in a per-session store; the agent itself is shared and stateless
+        self.sessions = create_session_store(self.config)
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self.news_index = None
+        self.prefetcher = None
+        if self.config.get('prefetch', {}).get('enabled', False):
+            self.news_index = NewsIndex(self.config['prefetch'].get('index_path', 'data/news_index.db'))
+        self.upstreams = UpstreamRegistry(self.config)
+        # Threads for blocking tool backends (sync tool calls and the async tools' network
+        # fetches), kept apart from the default executor that serves session and memory calls,
+        # so calls abandoned at the request deadline cannot starve those
+        self._tool_pool = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-tool")
+        self.news_retriever = AIMLNewsRetriever(self.config, self.news_index, self.upstreams, self._tool_pool)
+        if self.news_index is not None:
+            self.prefetcher = NewsPrefetcher(self.news_index, self.news_retriever, self.config)
+        self.tool_cache = create_tool_cache(self.config)
+        # Identical concurrent tool calls share one upstream fetch
+        self.singleflight = create_single_flight(self.config)
+        self.response_cache = create_semantic_cache(self.config)
+        self.router = create_query_router(self.config)
+        self.topic_filter = create_topic_filter(self.config)
+        # Per-request traces feed the Prometheus metrics served on /metrics
+        self.tracer = create_request_tracer(self.config)
+        # Bounded, prioritised slots for LLM runs, and per-client rate limits for the HTTP layer
+        self.admission = create_admission_controller(self.config)
+        self.rate_limiter = create_rate_limiter(self.config)
+        # Under a preloading server (see gunicorn.conf.py) nothing that holds files,
+        # sockets or threads is opened before the fork; workers do it in after_fork()
+        self._preloading = bool(os.getenv("CHATBOT_PRELOAD"))
+        # Uploaded documents, ingested in the background and searchable by the agent
+        self.documents = None if self._preloading else create_document_store(self.config)
+        # Bounded pool shared by all research digest fan-outs
+        self._digest_pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.config.get('research_digest', {}).get('max_workers', 8),
+            thread_name_prefix="research-digest"
+        )
+        self._background_started = False
         self._setup_agent()
+        self.memory = create_conversation_memory(self.config, self.sessions, self._summarize)
+        if not self._preloading:
+            self.start_background()
+    
+    def start_background(self):
+        """Start the background news prefetcher, once"""
+        if self.prefetcher is not None and not self._background_started:
+            self.prefetcher.start()
+        self._background_started = True
+    
+    def after_fork(self):
+        """Re-open per-process resources in a worker forked from a preloaded master.
+
+        The agent, prompt, tools, config and caches built in the master are
+        shared copy-on-write; SQLite connections, HTTP connection pools, the
+        document index and threads are not safe to inherit, so each worker opens its own.
+        Every worker starts a prefetcher, but a lock file lets only one of them sweep.
+        """
+        self.sessions.reset_connections()
+        if self.news_index is not None:
+            self.news_index.reset_connections()
+        self.tool_cache.backend.reset_connections()
+        self.upstreams.reset_connections()
+        if self._preloading:
+            self.documents = create_document_store(self.config)
+            self._preloading = False
+        self._loop = None
+        self.start_background()
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load configurations from yaml file"""
@@ -103,105 +504,337 @@ class AIMLChatbot:
         with open(config_path, 'r') as file:
             return yaml.safe_load(file)
     
+    def _format_news(self, news_items: List[Dict]) -> str:
+        if not news_items:
+            return Uncacheable("No recent AI/ML news found for your query.")
+        
+        result = "Latest AI/ML News:\n\n"
+        for i, item in enumerate(news_items, 1):
+            result += f"{i}. **{item['title']}**\n"
+            result += f"   Source: {item['source']}\n"
+            if item['description']:
+                result += f"   Summary: {item['description'][:150]}...\n"
+            result += f"   URL: {item['url']}\n\n"
+        
+        return result
+    
+    def _format_papers(self, papers: List[ArxivPaper]) -> str:
+        if not papers:
+            return Uncacheable("No recent AI/ML research papers found for your query.")
+        
+        result = "Recent AI/ML Research Papers:\n\n"
+        for i, paper in enumerate(papers, 1):
+            summary = paper.summary[:200] + '...' if len(paper.summary) > 200 else paper.summary
+            result += f"{i}. **{paper.title}**\n"
+            result += f"   Summary: {summary}\n"
+            result += f"   Published: {paper.published[:10]}\n"
+            result += f"   URL: {paper.url}\n\n"
+        
+        return result
+    
     def _create_ai_ml_news_tool(self):
-        """Create AI/ML news search tool"""
+        """Create AI/ML news search tool as a (sync, async) pair; failures raise and are never cached"""
         def search_ai_ml_news(query: str) -> str:
-            try:
-                news_items = self.news_retriever.get_ai_ml_news(query, limit=3)
-                if not news_items:
-                    return "No recent AI/ML news found for your query."
-                
-                result = "Latest AI/ML News:\n\n"
-                for i, item in enumerate(news_items, 1):
-                    result += f"{i}. **{item['title']}**\n"
-                    result += f"   Source: {item['source']}\n"
-                    if item['description']:
-                        result += f"   Summary: {item['description'][:150]}...\n"
-                    result += f"   URL: {item['url']}\n\n"
-                
-                return result
-            except Exception as e:
-                return f"Error retrieving AI/ML news: {str(e)}"
+            return self._format_news(self.news_retriever.get_ai_ml_news(query, limit=3))
+        
+        async def asearch_ai_ml_news(query: str) -> str:
+            return self._format_news(await self.news_retriever.aget_ai_ml_news(query, limit=3))
         
-        return search_ai_ml_news
+        return search_ai_ml_news, asearch_ai_ml_news
     
     def _create_arxiv_search_tool(self):
-        """Create arXiv research paper search tool"""
+        """Create arXiv research paper search tool as a (sync, async) pair; failures raise and are never cached"""
         def search_arxiv_papers(query: str) -> str:
+            return self._format_papers(self.news_retriever.search_arxiv(query, max_results=3))
+        
+        async def asearch_arxiv_papers(query: str) -> str:
+            return self._format_papers(await self.news_retriever.asearch_arxiv(query, max_results=3))
+        
+        return search_arxiv_papers, asearch_arxiv_papers
+    
+    def _digest_sources(self, query: str) -> Dict[str, Any]:
+        """Blocking callables for each research digest source"""
+        sources = {
+            "news": functools.partial(self.news_retriever.get_ai_ml_news, query, 3),
+            "papers": functools.partial(self.news_retriever.search_arxiv, query, 3),
+        }
+        if self.web_search_source is not None:
+            sources["web"] = functools.partial(self.web_search_source, query)
+        return sources
+    
+    def _format_digest(self, results: Dict[str, Any], timed_out: List[str], failed: List[str] = ()) -> str:
+        """Merge per-source results into one deduplicated observation.
+
+        A digest missing any source is returned as Uncacheable, so the partial
+        result is not served again once the source recovers.
+        """
+        seen = set()
+        
+        def is_new(title: str, url: str) -> bool:
+            keys = {url.split('?')[0].rstrip('/').lower(),
+                    re.sub(r'\W+', ' ', title).strip().lower()} - {''}
+            if keys & seen:
+                return False
+            seen.update(keys)
+            return True
+        
+        sections = []
+        news = [item for item in results.get("news") or [] if is_new(item['title'], item['url'])]
+        if news:
+            sections.append(self._format_news(news))
+        papers = [paper for paper in results.get("papers") or [] if is_new(paper.title, paper.url)]
+        if papers:
+            sections.append(self._format_papers(papers))
+        web = results.get("web")
+        if isinstance(web, dict):
+            # Tavily: structured results can be deduplicated against news/papers
+            web_items = [{'title': item.get('title', ''), 'url': item.get('url', ''), 'content': item.get('content', '')}
+                         for item in web.get('results', [])]
+            web_items = [item for item in web_items if is_new(item['title'], item['url'])]
+            if web_items:
+                lines = [f"{i}. **{item['title']}**\n   {item['content'][:200]}\n   URL: {item['url']}"
+                         for i, item in enumerate(web_items, 1)]
+                sections.append("Web Results:\n\n" + "\n\n".join(lines) + "\n")
+        elif web:
+            sections.append(f"Web Results:\n\n{web}\n")
+        if timed_out:
+            sections.append(f"(No results in time from: {', '.join(timed_out)})")
+        if failed:
+            sections.append(f"(Unavailable right now: {', '.join(failed)})")
+        if not sections:
+            return Uncacheable("No recent AI/ML news, papers or web results found for your query.")
+        digest = "\n".join(sections)
+        return Uncacheable(digest) if timed_out or failed else digest
+    
+    def _create_documents_search_tool(self):
+        """Create the uploaded-documents retrieval tool as a (sync, async) pair"""
+        top_k = self.config.get('documents', {}).get('top_k', 4)
+        
+        def search_user_documents(query: str) -> str:
+            session_id = current_session_id.get()
+            if session_id is None:
+                return "No uploaded documents matched your query."
             try:
-                papers = self.news_retriever.search_arxiv(query, max_results=3)
-                if not papers:
-                    return "No recent AI/ML research papers found for your query."
-                
-                result = "Recent AI/ML Research Papers:\n\n"
-                for i, paper in enumerate(papers, 1):
-                    result += f"{i}. **{paper['title']}**\n"
-                    result += f"   Summary: {paper['summary']}\n"
-                    result += f"   Published: {paper['published'][:10]}\n"
-                    result += f"   URL: {paper['url']}\n\n"
+                passages = self.documents.search(query, session_id, k=top_k)
+                if not passages:
+                    return "No uploaded documents matched your query."
                 
+                result = "Relevant passages from your documents:\n\n"
+                for i, passage in enumerate(passages, 1):
+                    result += f"{i}. **{passage['filename']}** (page {passage['page']})\n"
+                    result += f"   {passage['text']}\n\n"
                 return result
             except Exception as e:
-                return f"Error searching research papers: {str(e)}"
+                return f"Error searching your documents: {str(e)}"
+        
+        async def asearch_user_documents(query: str) -> str:
+            return await run_in_pool(self._tool_pool, search_user_documents, query)
+        
+        return search_user_documents, asearch_user_documents
+    
+    def _create_research_digest_tool(self):
+        """Create the parallel research digest tool as a (sync, async) pair"""
+        timeout = self.config.get('research_digest', {}).get('source_timeout_seconds', 8)
         
-        return search_arxiv_papers
+        def source_timeout() -> float:
+            # Never wait past the request deadline
+            deadline = get_deadline()
+            return min(timeout, deadline.remaining()) if deadline is not None else timeout
+        
+        def research_digest(query: str) -> str:
+            futures = {name: self._digest_pool.submit(source)
+                       for name, source in self._digest_sources(query).items()}
+            # Wall time is bounded by the slowest source, capped at the per-source timeout
+            concurrent.futures.wait(futures.values(), timeout=source_timeout())
+            results, timed_out, failed = {}, [], []
+            for name, future in futures.items():
+                if not future.done():
+                    future.cancel()
+                    timed_out.append(name)
+                elif future.exception() is not None:
+                    print(f"Warning: research digest source {name} failed: {future.exception()}")
+                    failed.append(name)
+                else:
+                    results[name] = future.result()
+            return self._format_digest(results, timed_out, failed)
+        
+        async def aresearch_digest(query: str) -> str:
+            sources = {
+                "news": self.news_retriever.aget_ai_ml_news(query, 3),
+                "papers": self.news_retriever.asearch_arxiv(query, 3),
+            }
+            if self.web_search_source is not None:
+                sources["web"] = run_in_pool(self._tool_pool, self.web_search_source, query)
+            wait_timeout = source_timeout()
+            outcomes = await asyncio.gather(
+                *(asyncio.wait_for(source, wait_timeout) for source in sources.values()),
+                return_exceptions=True
+            )
+            results, timed_out, failed = {}, [], []
+            for name, outcome in zip(sources, outcomes):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    timed_out.append(name)
+                elif isinstance(outcome, Exception):
+                    print(f"Warning: research digest source {name} failed: {outcome}")
+                    failed.append(name)
+                else:
+                    results[name] = outcome
+            return self._format_digest(results, timed_out, failed)
+        
+        return research_digest, aresearch_digest
+    
+    def _lazy_backend(self, factory) -> LazyResource:
+        """Wrap a tool backend factory; built at its first call unless startup.lazy_tools is off.
+
+        A preloading master builds everything up front so the workers share it.
+        """
+        backend = LazyResource(factory)
+        if self._preloading or not self.config.get('startup', {}).get('lazy_tools', True):
+            backend.get()
+        return backend
+    
+    @property
+    def agent_executor(self):
+        """The ReAct agent executor, built when the first question is routed to it"""
+        return self._agent_executor.get()
+    
+    def _build_agent_executor(self, tools: List[Tool]):
+        # langchain.agents imports langchain_community's tool and toolkit modules from its
+        # package __init__, so tool-free answers never pay for it
+        from langchain.agents import AgentExecutor, create_react_agent
+        agent_config = self.config['agent']
+        return AgentExecutor.from_agent_and_tools(
+            agent=create_react_agent(self.llm, tools, AGENT_PROMPT),
+            tools=tools,
+            verbose=agent_config.get('verbose', False),
+            max_iterations=agent_config.get('max_iterations', 10),
+            max_execution_time=agent_config.get('max_execution_time', 30),
+            # Stop with a placeholder output; _answer swaps in a partial answer
+            early_stopping_method="force"
+        )
+    
+    def _make_tool(self, name: str, func, coroutine, description: str, shared: bool = True) -> Tool:
+        """Build an agent tool whose sync and async paths go through the result cache and deadline guard.
+
+        shared=False is for tools whose results depend on the calling session:
+        they are neither coalesced nor cached across callers.
+        """
+        func, coroutine = self.tool_overrides.get(name, (func, coroutine))
+        if shared:
+            # Coalescing sits under the cache: only misses that would hit the upstream are merged
+            func, coroutine = self.singleflight.wrap(name, func), self.singleflight.awrap(name, coroutine)
+            func, coroutine = self.tool_cache.wrap(name, func), self.tool_cache.awrap(name, coroutine)
+        # The deadline guard sits outside the cache so cache hits are never cut short;
+        # timing wraps both, so it is the latency the agent actually waits for. Failures
+        # (an open upstream circuit included) become observations, so a broken tool never
+        # fails the agent run or counts against the Groq breaker
+        return Tool(
+            name=name,
+            func=observe_errors(name, timed_tool(name, bound_tool(func, self._tool_pool))),
+            coroutine=aobserve_errors(name, atimed_tool(name, abound_tool(coroutine))),
+            description=description
+        )
+    
+    def _create_groq_llm(self):
+        """The Groq chat model; imported here so an injected model skips the import"""
+        from langchain_groq import ChatGroq
+        return ChatGroq(
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            model_name=self.config['llm']['model'],
+            temperature=self.config['llm']['temperature'],
+            max_tokens=self.config['llm']['max_tokens'],
+            # Emit tokens to callbacks; invoke() still aggregates them for the blocking path
+            streaming=True,
+            request_timeout=self.upstreams['groq'].timeout,
+            max_retries=self.upstreams['groq'].settings['max_attempts'] - 1
+        )
     
     def _setup_agent(self):
         """Setup the AI/ML specialized agent with LangChain native decision-making"""
         try:
             # Initialize LLM
-            self.llm = ChatGroq(
-                groq_api_key=os.getenv("GROQ_API_KEY"),
-                model_name=self.config['llm']['model'],
-                temperature=self.config['llm']['temperature'],
-                max_tokens=self.config['llm']['max_tokens']
+            self.llm = self._llm_override or self._create_groq_llm()
+            
+            # Short prompt for the router's direct (tool-free) path
+            self.direct_system_prompt = (
+                f"{self.config['llm']['system_prompt']} "
+                f"If a question is not about AI/ML, reply exactly: \"{self.OFF_TOPIC_MESSAGE}\""
             )
             
             # Initialize tools
             tools = []
             
             # AI/ML News Tool
-            ai_ml_news_tool = Tool(
+            news_func, news_coroutine = self._create_ai_ml_news_tool()
+            ai_ml_news_tool = self._make_tool(
                 name="AI_ML_News_Search",
-                func=self._create_ai_ml_news_tool(),
+                func=news_func,
+                coroutine=news_coroutine,
                 description="Search for the latest AI and ML news, trends, and developments. Use this when users ask for current events, recent news, or latest developments in AI/ML."
             )
             tools.append(ai_ml_news_tool)
             
             # arXiv Research Tool
-            arxiv_tool = Tool(
+            arxiv_func, arxiv_coroutine = self._create_arxiv_search_tool()
+            arxiv_tool = self._make_tool(
                 name="ArXiv_Research_Search",
-                func=self._create_arxiv_search_tool(),
+                func=arxiv_func,
+                coroutine=arxiv_coroutine,
                 description="Search for recent AI/ML research papers on arXiv. Use this when users ask about recent research, new papers, or academic developments in AI/ML."
             )
             tools.append(arxiv_tool)
             
             # Enhanced Web Search for AI/ML
+            # web_search_source feeds the research digest: Tavily returns a dict, DuckDuckGo plain text
+            self.web_search_source = None
             try:
                 tavily_api_key = os.getenv("TAVILY_API_KEY")
                 if tavily_api_key:
-                    self.tavily_client = TavilyClient(api_key=tavily_api_key)
-                    def ai_ml_web_search(query: str) -> str:
+                    def build_tavily():
+                        from tavily import TavilyClient
+                        return TavilyClient(api_key=tavily_api_key)
+                    tavily_client = self._lazy_backend(build_tavily)
+                    
+                    def tavily_search(query: str) -> Dict:
                         enhanced_query = f"{query} AI ML artificial intelligence machine learning"
-                        results = self.tavily_client.search(enhanced_query, search_depth="advanced", max_results=3)
-                        return str(results)
+                        return self.upstreams['tavily'].call(
+                            tavily_client.get().search, enhanced_query, search_depth="advanced", max_results=3
+                        )
                     
-                    web_search_tool = Tool(
+                    def ai_ml_web_search(query: str) -> str:
+                        results = tavily_search(query)
+                        return str(results) if results.get('results') else Uncacheable(str(results))
+                    
+                    async def aai_ml_web_search(query: str) -> str:
+                        return await run_in_pool(self._tool_pool, ai_ml_web_search, query)
+                    
+                    web_search_tool = self._make_tool(
                         name="AI_ML_Web_Search",
                         func=ai_ml_web_search,
+                        coroutine=aai_ml_web_search,
                         description="Search the web for AI/ML related information, tutorials, tools, and resources. Use when you need current information not available in your knowledge base."
                     )
+                    self.web_search_source = tavily_search
                 else:
+                    def build_ddg():
+                        from langchain_community.tools import DuckDuckGoSearchRun
+                        return DuckDuckGoSearchRun()
+                    ddg = self._lazy_backend(build_ddg)
+                    
                     def ai_ml_ddg_search(query: str) -> str:
-                        ddg = DuckDuckGoSearchRun()
                         enhanced_query = f"{query} AI ML artificial intelligence machine learning"
-                        return ddg.run(enhanced_query)
+                        return search_reply(self.upstreams['ddg'].call(ddg.get().run, enhanced_query))
                     
-                    web_search_tool = Tool(
+                    async def aai_ml_ddg_search(query: str) -> str:
+                        return await run_in_pool(self._tool_pool, ai_ml_ddg_search, query)
+                    
+                    web_search_tool = self._make_tool(
                         name="AI_ML_Web_Search",
                         func=ai_ml_ddg_search,
+                        coroutine=aai_ml_ddg_search,
                         description="Search the web for AI/ML related information, tutorials, tools, and resources. Use when you need current information not available in your knowledge base."
                     )
+                    self.web_search_source = ai_ml_ddg_search
                 
                 tools.append(web_search_tool)
             except Exception as e:
@@ -209,80 +842,55 @@ class AIMLChatbot:
             
             # Wikipedia for AI/ML topics
             try:
-                wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+                def build_wikipedia():
+                    from langchain_community.tools import WikipediaQueryRun
+                    from langchain_community.utilities import WikipediaAPIWrapper
+                    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+                wikipedia = self._lazy_backend(build_wikipedia)
                 
                 def ai_ml_wikipedia_search(query: str) -> str:
                     # Enhance query with AI/ML context
                     enhanced_query = f"{query} artificial intelligence machine learning"
-                    return wikipedia.run(enhanced_query)
+                    return search_reply(self.upstreams['wikipedia'].call(wikipedia.get().run, enhanced_query))
+                
+                async def aai_ml_wikipedia_search(query: str) -> str:
+                    return await run_in_pool(self._tool_pool, ai_ml_wikipedia_search, query)
                 
-                wikipedia_tool = Tool(
+                wikipedia_tool = self._make_tool(
                     name="AI_ML_Wikipedia",
                     func=ai_ml_wikipedia_search,
+                    coroutine=aai_ml_wikipedia_search,
                     description="Search Wikipedia for detailed information about AI/ML concepts, history, people, and companies. Use for comprehensive background information."
                 )
                 tools.append(wikipedia_tool)
             except Exception as e:
                 print(f"Warning: Could not initialize Wikipedia: {e}")
             
-            # Create intelligent AI/ML prompt that leverages LangChain's decision-making
-            prompt = PromptTemplate.from_template(
-                """You are an AI/ML specialized chatbot assistant with extensive knowledge about artificial intelligence, machine learning, and data science.
-
-CORE PRINCIPLES:
-1. You specialize ONLY in AI/ML topics. For non-AI/ML questions, politely redirect: "I'm specialized in AI and ML topics only. Please ask questions related to artificial intelligence, machine learning, data science, deep learning, neural networks, or AI/ML research and trends."
-
-2. INTELLIGENT TOOL USAGE - Use your existing knowledge first, then tools only when needed:
-   
-   ANSWER DIRECTLY (no tools) when you have sufficient knowledge about:
-   ✓ Greetings and general conversation
-   ✓ AI/ML definitions and basic concepts (what is AI, ML, neural networks, etc.)
-   ✓ Algorithm explanations (backpropagation, gradient descent, CNNs, RNNs, etc.)
-   ✓ General AI/ML techniques and methodologies
-   ✓ Historical AI/ML information and well-established facts
-   ✓ Programming concepts related to AI/ML (Python libraries, frameworks)
-   ✓ Mathematical foundations (linear algebra, statistics for ML)
-   
-   USE TOOLS when you need current or specific information about:
-   ✓ Latest news: "recent AI developments", "current AI trends", "AI news today"
-   ✓ Research papers: "new research on...", "recent papers about...", "latest studies"
-   ✓ Company updates: "OpenAI latest", "Google AI news", "Microsoft AI updates"
-   ✓ Current events in the AI/ML field
-   ✓ Specific information you don't have in your knowledge base
-   ✓ Real-time developments and breaking news
-
-3. DECISION PROCESS:
-   - First evaluate if the question is AI/ML related
-   - Then assess if you can answer confidently with your existing knowledge
-   - Only use tools if you genuinely need current/additional information
-   - If answering directly, skip straight to Final Answer immediately
-
-Available tools: {tools}
-Tool names: {tool_names}
-
-FORMAT:
-Question: the input question you received
-Thought: I need to think about whether this is AI/ML related and if I can answer with my knowledge or need tools
-Action: [tool name] (ONLY if you need current/additional information)
-Action Input: [search query] (ONLY if using Action)
-Observation: [tool result] (ONLY if using Action)
-Thought: I now have the information needed to provide a comprehensive answer
-Final Answer: [your response to the user]
-
-Previous conversation context:
-{history}
-
-Question: {input}
-{agent_scratchpad}"""
-            )
+            # Retrieval over the user's uploaded documents
+            # Registered from config: when preloading, the store itself is opened after the fork
+            if self.documents is not None or (self._preloading and self.config.get('documents', {}).get('enabled', False)):
+                documents_func, documents_coroutine = self._create_documents_search_tool()
+                documents_tool = self._make_tool(
+                    name=self.DOCUMENTS_TOOL,
+                    func=documents_func,
+                    coroutine=documents_coroutine,
+                    description="Search the documents the user has uploaded (PDF, DOCX, TXT, MD). Use this when the user asks about their files, uploads, notes or 'my document'.",
+                    shared=False
+                )
+                tools.append(documents_tool)
             
-            # Create the agent executor
-            self.agent_executor = AgentExecutor.from_agent_and_tools(
-                agent=create_react_agent(self.llm, tools, prompt),
-                tools=tools,
-                verbose=True,
-                max_iterations=100
+            # Parallel news + arXiv + web digest for broad "what's new in X" questions
+            digest_func, digest_coroutine = self._create_research_digest_tool()
+            research_digest_tool = self._make_tool(
+                name="AI_ML_Research_Digest",
+                func=digest_func,
+                coroutine=digest_coroutine,
+                description="Search AI/ML news, arXiv papers and the web at the same time and get one merged, deduplicated digest. Use this for broad questions about what is new in an AI/ML area instead of calling the individual search tools one after another."
             )
+            tools.append(research_digest_tool)
+            
+            # The agent executor itself is deferred like the tool backends
+            self._agent_executor = self._lazy_backend(functools.partial(self._build_agent_executor, tools))
             
         except Exception as e:
             print(f"Error setting up agent: {e}")
@@ -290,70 +898,290 @@ Question: {input}
     
     def _is_ai_ml_related(self, query: str) -> bool:
         """Check if the query is related to AI/ML topics"""
-        # List of AI/ML related keywords
-        ai_ml_keywords = [
-            'ai', 'artificial intelligence', 'machine learning', 'ml', 'deep learning',
-            'neural network', 'data science', 'algorithm', 'model', 'training',
-            'dataset', 'prediction', 'classification', 'clustering', 'regression',
-            'tensorflow', 'pytorch', 'keras', 'scikit-learn', 'computer vision',
-            'nlp', 'natural language processing', 'reinforcement learning',
-            'supervised learning', 'unsupervised learning', 'chatbot', 'openai',
-            'gpt', 'bert', 'transformer', 'cnn', 'rnn', 'lstm'
-        ]
-        
-        # Convert query to lowercase for case-insensitive matching
-        query_lower = query.lower()
-        
-        # Check if any AI/ML keyword is in the query
-        return any(keyword in query_lower for keyword in ai_ml_keywords)
-
-    def get_response(self, user_input: str) -> dict:
-        """Get response from the chatbot"""
+        return self.topic_filter.is_related(query)
+
+    # Memory calls read and write the session store and count tokens, and recording may
+    # fold turns with an LLM call, so async paths run them through run_blocking
+    def _format_history(self, session_id: str) -> str:
+        """Render the session's token-budgeted history for the prompt's {history} slot"""
+        with stage("memory_context"):
+            return self.memory.format(session_id)
+
+    def _record_exchange(self, session_id: str, user_input: str, output: str):
+        """Update this session's chat history; older turns are folded into its summary"""
+        with stage("memory_record"):
+            self.memory.record(session_id, user_input, output)
+
+    def _summarize(self, prompt: str) -> str:
+        """One plain LLM call used by the memory to fold old turns into the summary"""
+        return self.upstreams['groq'].call(self.llm.invoke, prompt, retry_on=llm_transport_errors()).content
+
+    def _api_error_response(self, api_error: Exception) -> dict:
+        """Map an agent/LLM failure to a user-facing response"""
+        error_msg = str(api_error).lower()
+        if isinstance(api_error, CircuitOpenError) or "503" in error_msg or "service unavailable" in error_msg:
+            return {"response": self.SERVICE_UNAVAILABLE_MESSAGE, "play_warning": False}
+        print(f"Error getting response: {api_error}")
+        return {"response": self.ERROR_MESSAGE, "play_warning": False}
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """Background event loop that backs the synchronous API"""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="chatbot-event-loop", daemon=True).start()
+            return self._loop
+
+    def get_response(self, user_input: str, session_id: str = "default") -> dict:
+        """Get response from the chatbot for the given conversation session"""
+        # Thin wrapper: the async client objects stay bound to one long-lived loop
+        future = asyncio.run_coroutine_threadsafe(self.aget_response(user_input, session_id), self._get_loop())
+        return future.result()
+
+    async def _answer_directly(self, user_input: str, session_id: str, callbacks: Optional[List] = None) -> str:
+        """Single LLM call with a short prompt, for questions that need no tools"""
+        with stage("memory_context"):
+            summary, history = await run_blocking(self.memory.context, session_id)
+        system_prompt = self.direct_system_prompt
+        if summary:
+            system_prompt += f"\n\nSummary of earlier conversation: {summary}"
+        messages = [SystemMessage(content=system_prompt)]
+        for msg in history:
+            message_class = HumanMessage if msg["role"] == "user" else AIMessage
+            messages.append(message_class(content=msg["content"]))
+        messages.append(HumanMessage(content=user_input))
+        result = await self.llm.ainvoke(messages, config={"callbacks": callbacks} if callbacks else None)
+        return result.content
+
+    def _partial_answer(self, observations: List[str]) -> str:
+        """Best-effort answer when the time budget or iteration cap runs out"""
+        observations = [observation for observation in observations
+                        if observation not in (BUDGET_EXHAUSTED_MESSAGE, TOOL_TIMEOUT_MESSAGE)]
+        if not observations:
+            return self.TIMEOUT_MESSAGE
+        found = "\n\n".join(observation[:1500] for observation in observations)
+        return f"{self.PARTIAL_ANSWER_PREFIX}\n\n{found}"
+
+    async def _call_llm(self, coroutine_factory, timeout: float):
+        """Await an LLM-backed call under the Groq circuit breaker and the request deadline.
+
+        Only Groq transport failures count against the breaker; the request
+        running out of time, or anything raised from the agent's side, does not.
+        """
+        breaker = self.upstreams['groq'].breaker
+        if not breaker.allow():
+            raise CircuitOpenError("groq circuit is open")
         try:
-            # First check if the query is AI/ML related
-            is_ai_ml = self._is_ai_ml_related(user_input)
-            
-            if not is_ai_ml:
-                return {
-                    "response": "I'm specialized in AI and ML topics only. Please ask questions related to artificial intelligence, machine learning, data science, or AI/ML research and trends.",
-                    "play_warning": True
-                }
-            
+            result = await asyncio.wait_for(coroutine_factory(), timeout)
+        except asyncio.CancelledError:
+            breaker.release_trial()
+            raise
+        except Exception as e:
+            if isinstance(e, llm_transport_errors()):
+                breaker.record_failure()
+            else:
+                breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
+
+    async def _answer(self, user_input: str, session_id: str, emit=None) -> str:
+        """Answer an on-topic question, from the semantic cache when possible.
+
+        The whole answer runs under a Deadline of agent.max_execution_time
+        seconds. When emit is given, steps and answer tokens are streamed to it.
+        """
+        deadline = Deadline(self.config['agent'].get('max_execution_time', 30))
+        token = current_deadline.set(deadline)
+        session_token = current_session_id.set(session_id)
+        try:
+            return await self._answer_within(user_input, session_id, deadline, emit)
+        finally:
+            current_session_id.reset(session_token)
+            current_deadline.reset(token)
+
+    async def _has_history(self, session_id: str) -> bool:
+        """Whether earlier turns of this session (history or summary) can change the answer"""
+        history, summary = await run_blocking(self.sessions.get_session, session_id)
+        return bool(history or summary)
+
+    async def _answer_within(self, user_input: str, session_id: str, deadline: Deadline, emit=None) -> str:
+        # Cached answers are keyed on the question alone, so a question that leans on
+        # earlier turns of its session may neither use nor fill the cache
+        if self.response_cache is None or (is_follow_up(user_input) and await self._has_history(session_id)):
+            return await self._answer_uncached(user_input, session_id, deadline, emit)
+        # Embedding is CPU-bound, keep it off the event loop
+        with stage("semantic_cache_embed"):
+            vector = await run_blocking(self.response_cache.embed, user_input)
+        while True:
+            with stage("semantic_cache_lookup"):
+                cached, answering = self.response_cache.lookup_or_claim(vector)
+            if answering is None:
+                break
+            # A near-identical question is being answered; its answer is cached when it finishes
             try:
-                # Process AI/ML related query using the agent
-                response = self.agent_executor.invoke({
-                    "input": user_input,
-                    "history": "\n".join([f"{msg['role']}: {msg['content']}" for msg in self.memory["chat_history"][-10:]])
-                })
+                await asyncio.wait_for(asyncio.shield(answering), deadline.remaining())
+            except asyncio.TimeoutError:
+                return await self._answer_uncached(user_input, session_id, deadline, emit)
+        if cached is not None:
+            (get_trace() or RequestTrace()).route = "semantic_cache"
+            await run_blocking(self._record_exchange, session_id, user_input, cached)
+            return cached
+        try:
+            return await self._answer_uncached(user_input, session_id, deadline, emit, vector)
+        finally:
+            self.response_cache.release(vector)
+
+    async def _answer_uncached(self, user_input: str, session_id: str, deadline: Deadline, emit=None,
+                               vector=None) -> str:
+        """Answer with the direct LLM call or the agent; stores the answer under vector if given"""
+        trace = get_trace() or RequestTrace()
+        with stage("route"):
+            route = self.router.route(user_input) if self.router is not None else QueryRouter.AGENT
+        trace.route = route
+        metrics_handler = MetricsCallbackHandler(trace, route, self.memory.counter.count)
+        priority = PRIORITY_DIRECT if route == QueryRouter.DIRECT else PRIORITY_AGENT
+        # Off-topic questions and cache hits never reach this point, so they are never queued
+        async with self.admission.slot(priority, timeout=deadline.remaining()):
+            started = time.perf_counter()
+            complete = True
+            if route == QueryRouter.DIRECT:
+                callbacks = [metrics_handler] + ([StreamingAgentCallbackHandler(emit, direct=True)] if emit else [])
+                try:
+                    output = await self._call_llm(
+                        lambda: self._answer_directly(user_input, session_id, callbacks), deadline.remaining()
+                    )
+                except asyncio.TimeoutError:
+                    output, complete = self.TIMEOUT_MESSAGE, False
+                used_tools, private = False, False
+            else:
+                recorder = ToolObservationRecorder()
+                callbacks = [recorder, metrics_handler] + ([StreamingAgentCallbackHandler(emit)] if emit else [])
+                # The first agent question builds the executor (and its imports) off the event loop
+                agent_executor = await run_blocking(self._agent_executor.get)
+                history = await run_blocking(self._format_history, session_id)
+                try:
+                    response = await self._call_llm(lambda: agent_executor.ainvoke(
+                        {"input": user_input, "history": history},
+                        config={"callbacks": callbacks}
+                    ), deadline.remaining())
+                    output = response["output"]
+                    if output == self.AGENT_STOPPED_OUTPUT:
+                        # Iteration cap or the executor's own time limit was hit
+                        output, complete = self._partial_answer(recorder.observations), False
+                except asyncio.TimeoutError:
+                    output, complete = self._partial_answer(recorder.observations), False
+                used_tools = bool(recorder.observations)
+                # Answers built from the session's own uploads must not reach other sessions
+                private = self.DOCUMENTS_TOOL in recorder.tool_names
+        if self.router is not None:
+            self.router.record_latency(route, time.perf_counter() - started)
+        
+        if vector is not None and complete and not private:
+            self.response_cache.store(vector, output, used_tools=used_tools)
+        await run_blocking(self._record_exchange, session_id, user_input, output)
+        return output
+
+    async def aget_response(self, user_input: str, session_id: str = "default") -> dict:
+        """Get response from the chatbot without blocking the event loop"""
+        with self.tracer.request() as trace:
+            try:
+                # First check if the query is AI/ML related
+                with stage("topic_filter"):
+                    is_ai_ml = self._is_ai_ml_related(user_input)
                 
-                # Update chat history
-                self.memory["chat_history"].append({"role": "user", "content": user_input})
-                self.memory["chat_history"].append({"role": "assistant", "content": response["output"]})
+                if not is_ai_ml:
+                    trace.route = "off_topic"
+                    return {
+                        "response": self.OFF_TOPIC_MESSAGE,
+                        "play_warning": True
+                    }
                 
-                # Maintain history size
-                if len(self.memory["chat_history"]) > 20:
-                    self.memory["chat_history"] = self.memory["chat_history"][-20:]
+                # Process AI/ML related query using the agent
+                output = await self._answer(user_input, session_id)
                 
                 return {
-                    "response": response["output"],
+                    "response": output,
                     "play_warning": False
                 }
-            except Exception as api_error:
-                error_msg = str(api_error).lower()
-                if "503" in error_msg or "service unavailable" in error_msg:
-                    return {
-                        "response": "I apologize, but the AI service is temporarily unavailable. This is a temporary issue and should be resolved shortly. Please try again in a few moments.",
-                        "play_warning": False
-                    }
-                else:
-                    raise api_error
-            
-        except Exception as e:
-            print(f"Error getting response: {e}")
-            return {
-                "response": "I encountered an error processing your query. Could you please try again?",
-                "play_warning": False
-            }
+                
+            except Overloaded:
+                # The HTTP layer turns this into a 503 with Retry-After
+                trace.route = "rejected"
+                raise
+            except Exception as e:
+                trace.route = "error"
+                return self._api_error_response(e)
+
+    def get_response_stream(self, user_input: str, session_id: str = "default"):
+        """Yield agent steps and final-answer tokens as they arrive.
+
+        Events are dicts with a "type" of "step", "token" or "final"; the
+        "final" event carries the same payload as get_response().
+        """
+        events = queue.Queue()
+        
+        async def relay():
+            try:
+                async for event in self.aget_response_stream(user_input, session_id):
+                    events.put(event)
+            finally:
+                events.put(None)
+        
+        future = asyncio.run_coroutine_threadsafe(relay(), self._get_loop())
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # Client went away (GeneratorExit at yield): stop the agent run it no longer reads
+            future.cancel()
+
+    async def aget_response_stream(self, user_input: str, session_id: str = "default"):
+        """Async generator variant of get_response_stream"""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        
+        def emit(event):
+            # Callback handlers may fire from executor threads
+            loop.call_soon_threadsafe(events.put_nowait, event)
+        
+        async def run_agent():
+            # The trace lives in this task's context, not the generator's, which is re-entered per event
+            with self.tracer.request() as trace:
+                try:
+                    with stage("topic_filter"):
+                        is_ai_ml = self._is_ai_ml_related(user_input)
+                    if not is_ai_ml:
+                        trace.route = "off_topic"
+                        emit({"type": "final", "response": self.OFF_TOPIC_MESSAGE, "play_warning": True})
+                        return
+                    output = await self._answer(user_input, session_id, emit=emit)
+                    emit({"type": "final", "response": output, "play_warning": False})
+                except Overloaded as e:
+                    # Headers are already sent, so the rejection travels as the final event
+                    trace.route = "rejected"
+                    emit({"type": "final", "response": self.OVERLOADED_MESSAGE, "play_warning": False,
+                          "retry_after": e.retry_after})
+                except Exception as e:
+                    trace.route = "error"
+                    emit({"type": "final", **self._api_error_response(e)})
+                finally:
+                    emit(None)
+        
+        task = asyncio.ensure_future(run_agent())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            # Client went away before the answer finished
+            if not task.done():
+                task.cancel()
 
 def main():
     """Main function to run the AI/ML chatbot"""
@@ -383,7 +1211,7 @@ def main():
             if not user_input:
                 continue
             
-            response = chatbot.get_response(user_input)
+            response = chatbot.get_response(user_input, session_id="cli")
             print(f"\nAI/ML Bot: {response['response']}\n")
     
     except KeyboardInterrupt:
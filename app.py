@@ -1,6 +1,12 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
 from ai_ml_chatbot import AIMLChatbot
+from metrics import REGISTRY, stats_metrics
+from admission import Overloaded
 import os
+import json
+import math
+import re
+import uuid
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 
@@ -21,14 +27,60 @@ if not os.getenv("GROQ_API_KEY"):
 
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'docx', 'md'}
 
+RATE_LIMITED_MESSAGE = 'You are sending messages too quickly. Please wait a moment and try again.'
+
 # Initialize AI/ML chatbot
 try:
-    ai_ml_chatbot = AIMLChatbot()
+    ai_ml_chatbot = AIMLChatbot(os.getenv("CHATBOT_CONFIG", "config.yaml"))
     print("✅ AI/ML Chatbot initialized successfully!")
 except Exception as e:
     print(f"❌ Error initializing chatbot: {e}")
     ai_ml_chatbot = None
 
+# Session ids come from the client, so only accept short opaque tokens
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,128}$')
+
+def get_session_settings():
+    session_config = ai_ml_chatbot.config.get('session', {}) if ai_ml_chatbot else {}
+    return (session_config.get('cookie_name', 'chat_session_id'),
+            session_config.get('header_name', 'X-Session-ID'),
+            session_config.get('ttl_seconds', 3600))
+
+def get_session_id():
+    """Return (session_id, is_new) from the session header or cookie"""
+    cookie_name, header_name, _ = get_session_settings()
+    session_id = request.headers.get(header_name) or request.cookies.get(cookie_name)
+    if session_id and SESSION_ID_PATTERN.match(session_id):
+        return session_id, False
+    return uuid.uuid4().hex, True
+
+def attach_session_cookie(response, session_id):
+    cookie_name, _, ttl_seconds = get_session_settings()
+    response.set_cookie(cookie_name, session_id, max_age=int(ttl_seconds), httponly=True, samesite='Lax')
+    return response
+
+def trust_forwarded_for():
+    return ai_ml_chatbot.config.get('admission', {}).get('rate_limit', {}).get('trust_forwarded_for', False)
+
+def get_client_id():
+    """Rate-limit key: the client address (first X-Forwarded-For hop behind a trusted proxy)"""
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    if forwarded and trust_forwarded_for():
+        return forwarded.split(',')[0].strip()
+    return request.remote_addr or 'unknown'
+
+def rate_limit_wait():
+    """Seconds the client must wait before its next chat request (0 when allowed)"""
+    if ai_ml_chatbot.rate_limiter is None:
+        return 0
+    return ai_ml_chatbot.rate_limiter.acquire(get_client_id())
+
+def retry_response(message, status, retry_after):
+    response = jsonify({'response': message, 'play_warning': False})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -42,9 +94,18 @@ def chat():
         if ai_ml_chatbot is None:
             return jsonify({'response': 'Chatbot is not properly initialized. Please check your API keys and configuration.'}), 500
         
+        wait = rate_limit_wait()
+        if wait > 0:
+            return retry_response(RATE_LIMITED_MESSAGE, 429, wait)
+        
         user_message = request.json['message']
-        response = ai_ml_chatbot.get_response(user_message)
-        return jsonify(response)
+        session_id, is_new = get_session_id()
+        response = jsonify(ai_ml_chatbot.get_response(user_message, session_id=session_id))
+        if is_new:
+            attach_session_cookie(response, session_id)
+        return response
+    except Overloaded as e:
+        return retry_response(ai_ml_chatbot.OVERLOADED_MESSAGE, 503, e.retry_after)
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         return jsonify({
@@ -52,6 +113,46 @@ def chat():
             'play_warning': False
         }), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream agent steps and answer tokens as Server-Sent Events"""
+    if ai_ml_chatbot is None:
+        return jsonify({'response': 'Chatbot is not properly initialized. Please check your API keys and configuration.'}), 500
+    
+    wait = rate_limit_wait()
+    if wait > 0:
+        return retry_response(RATE_LIMITED_MESSAGE, 429, wait)
+    
+    user_message = request.json['message']
+    session_id, is_new = get_session_id()
+    
+    def generate():
+        try:
+            for event in ai_ml_chatbot.get_response_stream(user_message, session_id=session_id):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            print(f"Error in chat stream endpoint: {e}")
+            error_event = {
+                'type': 'final',
+                'response': 'I encountered an error processing your query. Could you please try again?',
+                'play_warning': False
+            }
+            yield f"event: final\ndata: {json.dumps(error_event)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    if is_new:
+        attach_session_cookie(response, session_id)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, LLM, tool and cache metrics"""
+    collected = stats_metrics(ai_ml_chatbot) if ai_ml_chatbot is not None else []
+    return Response(REGISTRY.render(collected), mimetype='text/plain; version=0.0.4')
+
 @app.route('/sound/<filename>')
 def serve_sound(filename):
     return send_from_directory('Sound', filename)
@@ -66,22 +167,46 @@ def upload_file():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         
-        if file:
-            # Create uploads directory if it doesn't exist
-            if not os.path.exists('uploads'):
-                os.makedirs('uploads')
-            
-            # Save the file
-            file_path = os.path.join('uploads', file.filename)
-            file.save(file_path)
-            
+        if not allowed_file(file.filename):
+            return jsonify({'error': f"Unsupported file type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"}), 400
+        
+        # Save the file under a unique name so uploads with the same name never overwrite each other
+        filename = secure_filename(file.filename)
+        file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}")
+        file.save(file_path)
+        
+        if ai_ml_chatbot is None or ai_ml_chatbot.documents is None:
             return jsonify({
                 'message': 'File uploaded successfully',
-                'filename': file.filename
+                'filename': filename
             })
+        
+        # Indexed for the uploading session only; parsing and embedding happen in the
+        # background, poll /upload/<job_id> for progress
+        session_id, is_new = get_session_id()
+        job_id = ai_ml_chatbot.documents.submit(file_path, filename, session_id)
+        response = jsonify({
+            'message': 'File uploaded successfully and queued for indexing',
+            'filename': filename,
+            'job_id': job_id
+        })
+        response.status_code = 202
+        if is_new:
+            attach_session_cookie(response, session_id)
+        return response
     except Exception as e:
         print(f"Error in upload endpoint: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/upload/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    if ai_ml_chatbot is None or ai_ml_chatbot.documents is None:
+        return jsonify({'error': 'Document indexing is not enabled'}), 404
+    session_id, _ = get_session_id()
+    job = ai_ml_chatbot.documents.job(job_id, session_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id'}), 404
+    return jsonify(job)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,181 @@
+import asyncio
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Iterator, Optional, AsyncIterator
+
+from news_index import query_words
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+OPENSEARCH = '{http://a9.com/-/spec/opensearch/1.1/}'
+
+
+@dataclass
+class ArxivPaper:
+    """One arXiv search result"""
+    __slots__ = ('arxiv_id', 'title', 'summary', 'url', 'published', 'updated', 'authors', 'categories')
+
+    arxiv_id: str
+    title: str
+    summary: str
+    url: str
+    published: str
+    updated: str
+    authors: List[str]
+    categories: List[str]
+
+    source = 'arXiv'
+
+    def to_dict(self) -> Dict:
+        return {
+            'arxiv_id': self.arxiv_id,
+            'title': self.title,
+            'summary': self.summary,
+            'url': self.url,
+            'published': self.published,
+            'updated': self.updated,
+            'authors': list(self.authors),
+            'categories': list(self.categories),
+            'source': self.source,
+        }
+
+
+def build_search_query(terms: Optional[str] = None, categories: Optional[List[str]] = None,
+                       date_from: Optional[date] = None, date_to: Optional[date] = None) -> str:
+    """arXiv search_query with explicit grouping: (cat OR cat) AND (all:w AND all:w) AND submittedDate:[...]
+
+    Every topical word is required, so stopwords and generic words ("latest",
+    "papers", "on") are dropped first; the categories already scope the search.
+    """
+    clauses = []
+    if categories:
+        clauses.append("(" + " OR ".join(f"cat:{category}" for category in categories) + ")")
+    words = query_words(terms)
+    if words:
+        clauses.append("(" + " AND ".join(f"all:{word}" for word in words) + ")")
+    if date_from or date_to:
+        start = date_from.strftime("%Y%m%d") + "0000" if date_from else "000001010000"
+        end = date_to.strftime("%Y%m%d") + "2359" if date_to else "999912312359"
+        clauses.append(f"submittedDate:[{start} TO {end}]")
+    return " AND ".join(clauses) or "all:*"
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return " ".join((element.text or "").split()) if element is not None else ""
+
+
+class AtomEntryParser:
+    """Incremental Atom parser: feed bytes as they arrive, get papers as each <entry> closes"""
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self.total_results = None
+
+    def feed(self, data: bytes) -> Iterator[ArxivPaper]:
+        self._parser.feed(data)
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                continue
+            if element.tag == f'{OPENSEARCH}totalResults':
+                self.total_results = int(element.text or 0)
+            elif element.tag == f'{ATOM}entry':
+                yield self._paper(element)
+                # Drop the finished entry so memory stays flat across the page
+                self._root.remove(element)
+
+    def close(self) -> None:
+        self._parser.close()
+
+    @staticmethod
+    def _paper(entry: ET.Element) -> ArxivPaper:
+        url = _text(entry.find(f'{ATOM}id'))
+        return ArxivPaper(
+            arxiv_id=url.rsplit('/abs/', 1)[-1],
+            title=_text(entry.find(f'{ATOM}title')),
+            summary=_text(entry.find(f'{ATOM}summary')),
+            url=url,
+            published=_text(entry.find(f'{ATOM}published')),
+            updated=_text(entry.find(f'{ATOM}updated')),
+            authors=[_text(author.find(f'{ATOM}name')) for author in entry.findall(f'{ATOM}author')],
+            categories=[category.get('term', '') for category in entry.findall(f'{ATOM}category')],
+        )
+
+
+class ArxivClient:
+    """Paginated arXiv API client that yields papers as they are parsed"""
+
+    API_URL = "https://export.arxiv.org/api/query"
+
+    def __init__(self, upstream, page_size: int = 100, request_interval: float = 3.0):
+        # upstream: http_client.Upstream for arXiv (pooled session, retries, breaker)
+        self.upstream = upstream
+        self.page_size = page_size
+        # arXiv asks clients to leave a few seconds between consecutive API calls
+        self.request_interval = request_interval
+
+    def _params(self, search_query: str, start: int, count: int, sort_by: str) -> Dict:
+        return {
+            'search_query': search_query,
+            'start': start,
+            'max_results': count,
+            'sortBy': sort_by,
+            'sortOrder': 'descending',
+        }
+
+    def iter_search(self, terms: Optional[str] = None, categories: Optional[List[str]] = None,
+                    date_from: Optional[date] = None, date_to: Optional[date] = None,
+                    max_results: int = 10, sort_by: str = 'submittedDate') -> Iterator[ArxivPaper]:
+        """Yield up to max_results papers, streaming each page off the socket"""
+        search_query = build_search_query(terms, categories, date_from, date_to)
+        yielded = 0
+        while yielded < max_results:
+            if yielded:
+                time.sleep(self.request_interval)
+            count = min(self.page_size, max_results - yielded)
+            response = self.upstream.get(self.API_URL, params=self._params(search_query, yielded, count, sort_by), stream=True)
+            response.raise_for_status()
+            parser = AtomEntryParser()
+            in_page = 0
+            try:
+                for chunk in response.iter_content(chunk_size=16384):
+                    for paper in parser.feed(chunk):
+                        yield paper
+                        in_page += 1
+                parser.close()
+            finally:
+                response.close()
+            yielded += in_page
+            if in_page < count or (parser.total_results is not None and yielded >= parser.total_results):
+                break
+
+    async def aiter_search(self, terms: Optional[str] = None, categories: Optional[List[str]] = None,
+                           date_from: Optional[date] = None, date_to: Optional[date] = None,
+                           max_results: int = 10, sort_by: str = 'submittedDate') -> AsyncIterator[ArxivPaper]:
+        """Async variant of iter_search; each page is bounded by page_size"""
+        search_query = build_search_query(terms, categories, date_from, date_to)
+        yielded = 0
+        while yielded < max_results:
+            if yielded:
+                await asyncio.sleep(self.request_interval)
+            count = min(self.page_size, max_results - yielded)
+            response = await self.upstream.aget(self.API_URL, params=self._params(search_query, yielded, count, sort_by))
+            response.raise_for_status()
+            parser = AtomEntryParser()
+            in_page = 0
+            for paper in parser.feed(response.content):
+                yield paper
+                in_page += 1
+            parser.close()
+            yielded += in_page
+            if in_page < count or (parser.total_results is not None and yielded >= parser.total_results):
+                break
+
+    def search(self, *args, **kwargs) -> List[ArxivPaper]:
+        return list(self.iter_search(*args, **kwargs))
+
+    async def asearch(self, *args, **kwargs) -> List[ArxivPaper]:
+        return [paper async for paper in self.aiter_search(*args, **kwargs)]
@@ -0,0 +1,154 @@
+"""ASGI entry point serving the async chat path beside the Flask app.
+
+/chat and /chat/stream are handled natively on the event loop so many
+in-flight chats share one loop; every other route falls through to Flask.
+
+Run with: uvicorn asgi:application --port 5000
+"""
+import json
+import math
+import uuid
+from http.cookies import SimpleCookie
+
+from asgiref.wsgi import WsgiToAsgi
+
+from admission import Overloaded
+from app import (app as flask_app, ai_ml_chatbot, SESSION_ID_PATTERN, RATE_LIMITED_MESSAGE,
+                 get_session_settings, trust_forwarded_for)
+
+flask_asgi = WsgiToAsgi(flask_app)
+
+NOT_INITIALIZED_MESSAGE = 'Chatbot is not properly initialized. Please check your API keys and configuration.'
+ERROR_MESSAGE = 'I encountered an error processing your query. Could you please try again?'
+
+
+async def read_json(receive) -> dict:
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    return json.loads(body or b'{}')
+
+
+def get_session_id(scope) -> tuple:
+    """Return (session_id, is_new) from the session header or cookie"""
+    cookie_name, header_name, _ = get_session_settings()
+    headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+    session_id = headers.get(header_name.lower())
+    if not session_id and 'cookie' in headers:
+        cookie = SimpleCookie()
+        cookie.load(headers['cookie'])
+        if cookie_name in cookie:
+            session_id = cookie[cookie_name].value
+    if session_id and SESSION_ID_PATTERN.match(session_id):
+        return session_id, False
+    return uuid.uuid4().hex, True
+
+
+def get_client_id(scope) -> str:
+    """Rate-limit key: the client address (first X-Forwarded-For hop behind a trusted proxy)"""
+    for key, value in scope['headers']:
+        if key.lower() == b'x-forwarded-for' and trust_forwarded_for():
+            return value.decode('latin-1').split(',')[0].strip()
+    client = scope.get('client')
+    return client[0] if client else 'unknown'
+
+
+async def reject(send, status: int, message: str, retry_after: float):
+    headers = [(b'content-type', b'application/json'),
+               (b'retry-after', str(max(1, math.ceil(retry_after))).encode())]
+    await send_json(send, status, {'response': message, 'play_warning': False}, headers)
+
+
+async def rate_limited(scope, send) -> bool:
+    """Send a 429 and return True if the client is over its rate limit"""
+    if ai_ml_chatbot.rate_limiter is None:
+        return False
+    wait = ai_ml_chatbot.rate_limiter.acquire(get_client_id(scope))
+    if wait <= 0:
+        return False
+    await reject(send, 429, RATE_LIMITED_MESSAGE, wait)
+    return True
+
+
+def response_headers(content_type: str, session_id: str, is_new: bool) -> list:
+    headers = [(b'content-type', content_type.encode())]
+    if is_new:
+        cookie_name, _, ttl_seconds = get_session_settings()
+        cookie = f"{cookie_name}={session_id}; Max-Age={int(ttl_seconds)}; HttpOnly; SameSite=Lax; Path=/"
+        headers.append((b'set-cookie', cookie.encode()))
+    return headers
+
+
+async def send_json(send, status: int, payload: dict, headers: list = None):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers or [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(payload).encode()})
+
+
+async def chat(scope, receive, send):
+    if ai_ml_chatbot is None:
+        await send_json(send, 500, {'response': NOT_INITIALIZED_MESSAGE})
+        return
+    if await rate_limited(scope, send):
+        return
+    try:
+        user_message = (await read_json(receive))['message']
+        session_id, is_new = get_session_id(scope)
+        response = await ai_ml_chatbot.aget_response(user_message, session_id=session_id)
+        await send_json(send, 200, response, response_headers('application/json', session_id, is_new))
+    except Overloaded as e:
+        await reject(send, 503, ai_ml_chatbot.OVERLOADED_MESSAGE, e.retry_after)
+    except Exception as e:
+        print(f"Error in async chat endpoint: {e}")
+        await send_json(send, 500, {'response': ERROR_MESSAGE, 'play_warning': False})
+
+
+async def chat_stream(scope, receive, send):
+    if ai_ml_chatbot is None:
+        await send_json(send, 500, {'response': NOT_INITIALIZED_MESSAGE})
+        return
+    if await rate_limited(scope, send):
+        return
+    user_message = (await read_json(receive))['message']
+    session_id, is_new = get_session_id(scope)
+    headers = response_headers('text/event-stream', session_id, is_new)
+    headers += [(b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    try:
+        async for event in ai_ml_chatbot.aget_response_stream(user_message, session_id=session_id):
+            chunk = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    except Exception as e:
+        print(f"Error in async chat stream endpoint: {e}")
+        error_event = {'type': 'final', 'response': ERROR_MESSAGE, 'play_warning': False}
+        chunk = f"event: final\ndata: {json.dumps(error_event)}\n\n"
+        await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+ASYNC_ROUTES = {
+    '/chat': chat,
+    '/chat/stream': chat_stream,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    handler = ASYNC_ROUTES.get(scope['path'])
+    if scope['type'] == 'http' and scope['method'] == 'POST' and handler is not None:
+        await handler(scope, receive, send)
+    else:
+        await flask_asgi(scope, receive, send)
@@ -0,0 +1,280 @@
+"""Offline load test for AIMLChatbot: replayed LLM traces, stand-in tools, no network.
+
+Drives get_response (--target bot) or the Flask /chat endpoint (--target flask)
+at a fixed concurrency and reports latency percentiles, throughput,
+prompt tokens, tool backend calls and cache/router stats. With --check, exits
+non-zero when a metric breaks the bounds in thresholds.yaml. Tokens are counted
+with an offline approximation of cl100k_base unless --tiktoken is given.
+--tracemalloc adds a second pass over the same workload under tracemalloc to
+report allocations; latency always comes from the first, untraced pass.
+
+Usage:
+  python benchmarks/bench_chat.py [--target bot|flask] [--requests 200] [--concurrency 8]
+                                  [--llm-latency 0.05] [--tool-latency 0.02] [--tracemalloc]
+                                  [--check benchmarks/thresholds.yaml] [--json results.json]
+"""
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import yaml
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+from fakes import (FakeToolBackends, HashingEmbedder, LLMUsage, create_replay_llm, load_traces, agent_steps,  # noqa: E402
+                   install_offline_tokenizer)
+from query_router import QueryRouter, create_query_router  # noqa: E402
+from topic_filter import create_topic_filter  # noqa: E402
+
+
+def load_config() -> dict:
+    with open(os.path.join(ROOT, 'config.yaml')) as file:
+        return yaml.safe_load(file)
+
+
+def offline_config_path(config: dict) -> str:
+    """Copy of config.yaml with every background job and model download switched off"""
+    config = json.loads(json.dumps(config))
+    config.setdefault('prefetch', {})['enabled'] = False
+    config.setdefault('documents', {})['enabled'] = False
+    # Attached afterwards with a hashing embedder instead of sentence-transformers
+    config.setdefault('semantic_cache', {})['enabled'] = False
+    config.setdefault('topic_filter', {}).setdefault('embedding', {})['enabled'] = False
+    config.setdefault('agent', {})['verbose'] = False
+    config.setdefault('cache', {})['backend'] = 'memory'
+    config.setdefault('session', {})['backend'] = 'memory'
+    # Every simulated user shares one client address
+    config.setdefault('admission', {}).setdefault('rate_limit', {})['enabled'] = False
+    handle, path = tempfile.mkstemp(prefix='bench-config-', suffix='.yaml')
+    with os.fdopen(handle, 'w') as file:
+        yaml.safe_dump(config, file)
+    return path
+
+
+def expected_response(trace: dict, off_topic_message: str) -> str:
+    if trace['route'] == 'off_topic':
+        return off_topic_message
+    if trace['route'] == 'direct':
+        return trace['answer']
+    return agent_steps(trace)[-1].split("Final Answer:", 1)[1].strip()
+
+
+def route_mismatches(config: dict, traces: list) -> list:
+    """Traces the current topic filter and router send somewhere other than their labelled route"""
+    topic_filter = create_topic_filter(config)
+    router = create_query_router(config)
+    mismatches = []
+    for trace in traces:
+        if not topic_filter.is_related(trace['question']):
+            route = 'off_topic'
+        else:
+            route = router.route(trace['question']) if router is not None else QueryRouter.AGENT
+        if route != trace['route']:
+            mismatches.append(f"{trace['question']!r}: expected {trace['route']}, got {route}")
+    return mismatches
+
+
+def build_chatbot(config: dict, config_path: str, traces: list, args, usage: LLMUsage, tools: FakeToolBackends):
+    from ai_ml_chatbot import AIMLChatbot
+    from semantic_cache import SemanticResponseCache
+    bot = AIMLChatbot(config_path, llm=create_replay_llm(traces, args.llm_latency, usage),
+                      tool_overrides=tools.overrides())
+    cache_config = config.get('semantic_cache', {})
+    if cache_config.get('enabled', False) and not args.no_semantic_cache:
+        bot.response_cache = SemanticResponseCache(
+            HashingEmbedder(),
+            threshold=cache_config.get('similarity_threshold', 0.92),
+            max_entries=cache_config.get('max_entries', 2000),
+            ttl_seconds=cache_config.get('ttl_seconds', 86400),
+            tool_ttl_seconds=cache_config.get('tool_ttl_seconds', 600),
+        )
+    return bot
+
+
+def make_sender(target: str, bot, config_path: str):
+    """Return send(question, session_id) -> response text"""
+    if target == 'bot':
+        return lambda question, session_id: bot.get_response(question, session_id=session_id)['response']
+
+    os.environ['CHATBOT_CONFIG'] = config_path
+    import app as flask_app_module
+    # app.py builds its own chatbot at import; swap in the one wired to the fakes
+    flask_app_module.ai_ml_chatbot = bot
+    header_name = flask_app_module.get_session_settings()[1]
+    local = threading.local()
+
+    def send(question, session_id):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = flask_app_module.app.test_client()
+        response = client.post('/chat', json={'message': question}, headers={header_name: session_id})
+        return response.get_json()['response']
+    return send
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_load(send, workload: list, concurrency: int):
+    def one(item):
+        trace, session_id, expected = item
+        started = time.perf_counter()
+        try:
+            response = send(trace['question'], session_id)
+            outcome = 'ok' if response == expected else 'mismatch'
+        except Exception as e:
+            print(f"request failed: {e}")
+            outcome = 'error'
+        return time.perf_counter() - started, outcome
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, workload))
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['bot', 'flask'], default='bot')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--sessions', type=int, default=20, help="distinct conversations in the load")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument('--tool-latency', type=float, default=0.02, help="seconds per fake tool call")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--traces', default=os.path.join(BENCH_DIR, 'replay_traces.yaml'))
+    parser.add_argument('--no-semantic-cache', action='store_true')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="measure allocations in a second, traced pass (warm caches)")
+    parser.add_argument('--tiktoken', action='store_true',
+                        help="count tokens with the real cl100k_base encoding (downloaded on first use)")
+    parser.add_argument('--check', help="thresholds file; exit 1 if any bound is broken")
+    parser.add_argument('--json', help="also write the metrics to this file")
+    args = parser.parse_args()
+
+    if not args.tiktoken:
+        install_offline_tokenizer()
+    config = load_config()
+    traces = load_traces(args.traces)
+    config_path = offline_config_path(config)
+    usage = LLMUsage()
+    tools = FakeToolBackends(args.tool_latency)
+    try:
+        bot = build_chatbot(config, config_path, traces, args, usage, tools)
+        send = make_sender(args.target, bot, config_path)
+
+        rng = random.Random(args.seed)
+        weights = [trace.get('weight', 1) for trace in traces]
+        workload = []
+        for _ in range(args.requests):
+            trace = rng.choices(traces, weights)[0]
+            session_id = f"bench-session-{rng.randrange(args.sessions):04d}"
+            workload.append((trace, session_id, expected_response(trace, bot.OFF_TOPIC_MESSAGE)))
+
+        results, elapsed = run_load(send, workload, args.concurrency)
+        # Counters are read before the traced pass so they describe the measured one
+        llm_usage = usage.snapshot()
+        tool_calls = dict(tools.calls)
+        semantic_stats = bot.response_cache.stats() if bot.response_cache is not None else {}
+        tool_cache_stats = bot.tool_cache.stats()
+        singleflight_stats = bot.singleflight.stats()
+        router_stats = bot.router.stats() if bot.router is not None else {}
+        allocations = {}
+        if args.tracemalloc:
+            # tracemalloc slows every allocation several-fold, so it never shares a pass with latency
+            tracemalloc.start(10)
+            run_load(send, workload, args.concurrency)
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            allocations = {
+                "retained_mib": round(current / 2 ** 20, 2),
+                "peak_mib": round(peak / 2 ** 20, 2),
+                "top_sites": [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} "
+                              f"{stat.size / 1024:.1f} KiB in {stat.count} blocks"
+                              for stat in snapshot.statistics('lineno')[:5]],
+            }
+    finally:
+        os.unlink(config_path)
+
+    latencies = sorted(seconds * 1000 for seconds, _ in results)
+    outcomes = [outcome for _, outcome in results]
+    lookups = semantic_stats.get('hits', 0) + semantic_stats.get('misses', 0)
+    metrics = {
+        "target": args.target,
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "error_rate": outcomes.count('error') / len(outcomes),
+        "mismatch_rate": outcomes.count('mismatch') / len(outcomes),
+        "llm_calls": llm_usage["calls"],
+        "prompt_tokens": llm_usage["prompt_tokens"],
+        "prompt_tokens_per_request": round(llm_usage["prompt_tokens"] / len(results), 1),
+        "tool_backend_calls": tool_calls,
+        "tool_calls_per_request": round(sum(tool_calls.values()) / len(results), 3),
+        "semantic_cache": semantic_stats,
+        "semantic_cache_hit_rate": round(semantic_stats.get('hits', 0) / lookups, 3) if lookups else 0.0,
+        "tool_cache": tool_cache_stats,
+        "singleflight": singleflight_stats,
+        "router": router_stats,
+        "route_mismatches": route_mismatches(config, traces),
+        "allocations": allocations,
+    }
+
+    print(f"target={metrics['target']} requests={metrics['requests']} concurrency={metrics['concurrency']} "
+          f"errors={metrics['error_rate']:.1%} wrong answers={metrics['mismatch_rate']:.1%}")
+    print(f"latency ms: p50={metrics['p50_ms']} p95={metrics['p95_ms']} p99={metrics['p99_ms']} max={metrics['max_ms']}")
+    print(f"throughput: {metrics['throughput_rps']} req/s")
+    if allocations:
+        print(f"allocations (traced pass): peak={allocations['peak_mib']} MiB retained={allocations['retained_mib']} MiB")
+        for site in allocations['top_sites']:
+            print(f"  {site}")
+    print(f"llm calls: {metrics['llm_calls']} prompt tokens: {metrics['prompt_tokens']} "
+          f"({metrics['prompt_tokens_per_request']}/request)")
+    print(f"tool backend calls: {metrics['tool_backend_calls']} ({metrics['tool_calls_per_request']}/request)")
+    print(f"semantic cache: {semantic_stats} hit rate={metrics['semantic_cache_hit_rate']}")
+    print(f"tool cache: {metrics['tool_cache']}")
+    print(f"tool coalescing: {metrics['singleflight']}")
+    print(f"router: {metrics['router']}")
+    for mismatch in metrics['route_mismatches']:
+        print(f"route mismatch: {mismatch}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(metrics, file, indent=2)
+
+    if args.check:
+        with open(args.check) as file:
+            thresholds = yaml.safe_load(file)
+        failures = []
+        for key, bound in thresholds.items():
+            kind, metric = key.split('_', 1)
+            value = len(metrics[metric]) if isinstance(metrics[metric], list) else metrics[metric]
+            if (kind == 'max' and value > bound) or (kind == 'min' and value < bound):
+                failures.append(f"{metric}={value} breaks {key}={bound}")
+        for failure in failures:
+            print(f"REGRESSION: {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Startup cost: module import time and chatbot construction, lazy vs. eager tool backends.
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+Uses the offline config from bench_chat.py (no prefetcher, documents or
+sentence-transformers downloads) and the offline token counter from fakes.py;
+the Groq client is built with a placeholder key and never called.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--top N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_chat import load_config, offline_config_path  # noqa: E402
+
+# Imports that lazy startup should keep out of the process until an agent question needs them
+DEFERRED_MODULES = ['langchain.agents', 'langchain_community.tools', 'gnews', 'tavily',
+                    'duckduckgo_search', 'wikipedia', 'feedparser', 'sentence_transformers', 'chromadb']
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import ai_ml_chatbot
+imported = time.perf_counter()
+# tiktoken would download cl100k_base during construction
+sys.path.insert(0, "benchmarks")
+from fakes import install_offline_tokenizer
+install_offline_tokenizer()
+construct_started = time.perf_counter()
+bot = ai_ml_chatbot.AIMLChatbot(sys.argv[1])
+built = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "construct_s": built - construct_started,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "loaded": [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+"""
+
+
+def run_child(config_path: str) -> dict:
+    env = dict(os.environ, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "placeholder"))
+    # Measure the web-search path every deployment has, not whichever key happens to be set
+    env.pop("TAVILY_API_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, config_path, json.dumps(DEFERRED_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_times() -> list:
+    """(module, self seconds, cumulative seconds) for every module `import ai_ml_chatbot` loads,
+    from python -X importtime; nesting depth is ignored"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import ai_ml_chatbot"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument('--top', type=int, default=10, help="modules and packages to list in the import-time report")
+    args = parser.parse_args()
+
+    config = load_config()
+    for mode, lazy in (("lazy", True), ("eager", False)):
+        config.setdefault('startup', {})['lazy_tools'] = lazy
+        config_path = offline_config_path(config)
+        try:
+            samples = [run_child(config_path) for _ in range(args.runs)]
+        finally:
+            os.remove(config_path)
+        imports = statistics.median(s['import_s'] for s in samples)
+        construct = statistics.median(s['construct_s'] for s in samples)
+        rss = statistics.median(s['max_rss_mb'] for s in samples)
+        print(f"{mode:<6} import={imports * 1000:7.1f} ms  construct={construct * 1000:7.1f} ms  "
+              f"total={(imports + construct) * 1000:7.1f} ms  max_rss={rss:6.1f} MB")
+        print(f"       deferred modules loaded: {', '.join(samples[-1]['loaded']) or 'none'}")
+
+    rows = import_times()
+    print("\nslowest modules to import (self time; cumulative includes their imports):")
+    for name, self_s, cumulative_s in sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"  {name:<48} self={self_s * 1000:7.1f} ms  cumulative={cumulative_s * 1000:7.1f} ms")
+    packages = {}
+    for name, self_s, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_s
+    print("\nimport time by top-level package (sum of self times):")
+    for package, seconds in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {package:<48} {seconds * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Accuracy and per-query cost of the topic filter against the legacy keyword scan.
+
+The legacy and compiled rows use the same vocabulary (config.yaml's), so they
+compare the matchers alone; the vocabulary row runs the compiled matcher with
+the built-in DEFAULT_VOCABULARY, so the difference from the compiled row is the
+vocabulary change alone.
+
+Usage: python benchmarks/bench_topic_filter.py [--embedding] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from topic_filter import DEFAULT_VOCABULARY, TopicFilter, create_topic_filter  # noqa: E402
+
+
+def legacy_matcher(vocabulary: list):
+    """The original implementation over `vocabulary`: list rebuilt per call, one substring scan per keyword"""
+    def legacy_is_ai_ml_related(query: str) -> bool:
+        ai_ml_keywords = list(vocabulary)
+        query_lower = query.lower()
+        return any(keyword in query_lower for keyword in ai_ml_keywords)
+    return legacy_is_ai_ml_related
+
+
+def evaluate(name, classify, labeled, repeat):
+    tp = fp = tn = fn = 0
+    mistakes = []
+    for query, related in labeled:
+        predicted = classify(query)
+        if predicted and related:
+            tp += 1
+        elif predicted:
+            fp += 1
+            mistakes.append(f"  false positive: {query}")
+        elif related:
+            fn += 1
+            mistakes.append(f"  false negative: {query}")
+        else:
+            tn += 1
+    queries = [query for query, _ in labeled]
+    seconds = min(timeit.repeat(lambda: [classify(q) for q in queries], number=repeat, repeat=3))
+    per_query_us = seconds / (repeat * len(queries)) * 1e6
+    accuracy = (tp + tn) / len(labeled)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    print(f"{name:<24} accuracy={accuracy:.3f} precision={precision:.3f} recall={recall:.3f} "
+          f"cost={per_query_us:.2f} us/query")
+    for line in mistakes:
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--embedding', action='store_true', help="also enable the embedding scorer")
+    parser.add_argument('--repeat', type=int, default=200, help="passes over the labeled set per timing run")
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'config.yaml')) as file:
+        config = yaml.safe_load(file)
+    with open(os.path.join(ROOT, 'benchmarks', 'topic_filter_labels.yaml')) as file:
+        labels = yaml.safe_load(file)
+    labeled = [(q, True) for q in labels['on_topic']] + [(q, False) for q in labels['off_topic']]
+    print(f"{len(labeled)} labeled queries ({len(labels['on_topic'])} on-topic)\n")
+
+    filter_config = config.setdefault('topic_filter', {})
+    vocabulary = filter_config.get('vocabulary') or DEFAULT_VOCABULARY
+    filter_config.setdefault('embedding', {})['enabled'] = False
+    evaluate("legacy", legacy_matcher(vocabulary), labeled, args.repeat)
+    evaluate("compiled", create_topic_filter(config).is_related, labeled, args.repeat)
+    evaluate("compiled, default vocab", TopicFilter(DEFAULT_VOCABULARY).is_related, labeled, args.repeat)
+    if args.embedding:
+        config['topic_filter']['embedding']['enabled'] = True
+        evaluate("embedding", create_topic_filter(config).is_related, labeled, max(1, args.repeat // 50))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Offline stand-ins for Groq, the tool backends and the embedding model.
+
+Nothing here touches the network, so the benchmarks run the same in CI as
+on a laptop. Latencies are simulated with sleeps.
+"""
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+import yaml
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import conversation_memory
+from conversation_memory import TokenCounter
+
+# Canned reply when the memory asks for a summary of older turns
+SUMMARY_REPLY = "The user has been asking about AI/ML concepts, tools and recent research."
+
+
+class ApproximateEncoding:
+    """Offline stand-in for tiktoken's cl100k_base, which is downloaded on first use.
+
+    Counts words (split every eight characters) and punctuation marks, which
+    tracks cl100k_base closely on English text.
+    """
+
+    PIECE = re.compile(r"\w{1,8}|[^\w\s]")
+
+    def encode(self, text: str) -> List[str]:
+        return self.PIECE.findall(text)
+
+
+class _OfflineTiktoken:
+    @staticmethod
+    def get_encoding(name: str) -> ApproximateEncoding:
+        return ApproximateEncoding()
+
+
+def install_offline_tokenizer() -> None:
+    """Make every TokenCounter built from now on, the chatbot's included, use ApproximateEncoding"""
+    conversation_memory.tiktoken = _OfflineTiktoken
+
+
+class LLMUsage:
+    """Thread-safe call and prompt-token counters shared with the harness"""
+
+    def __init__(self):
+        self.counter = TokenCounter()
+        self._lock = threading.Lock()
+        self.calls = Counter()
+        self.prompt_tokens = 0
+
+    def record(self, kind: str, prompt: str) -> None:
+        tokens = self.counter.count(prompt)
+        with self._lock:
+            self.calls[kind] += 1
+            self.prompt_tokens += tokens
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "prompt_tokens": self.prompt_tokens}
+
+
+def load_traces(path: str) -> List[Dict]:
+    with open(path) as file:
+        return yaml.safe_load(file)['traces']
+
+
+def agent_steps(trace: Dict) -> List[str]:
+    """ReAct completions for a trace, one per LLM call"""
+    return trace.get('steps') or [f"Thought: I can answer this from my own knowledge.\nFinal Answer: {trace['answer']}"]
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that replays canned ReAct traces keyed by the question.
+
+    The step to replay is the number of observations already in the agent
+    scratchpad, so concurrent requests never interfere with each other.
+    Direct-route calls (a message list ending in the question) get the
+    trace's answer; summary prompts get SUMMARY_REPLY.
+    """
+
+    traces: Dict[str, Dict]
+    latency: float = 0.05
+    usage: Any = None
+    default_answer: str = "Here is a general overview of that AI/ML topic."
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        if prompt.rstrip().endswith("New summary:"):
+            self.usage.record("summary", prompt)
+            return SUMMARY_REPLY
+        questions = list(re.finditer(r"^Question: (.*)$", prompt, re.MULTILINE))
+        if len(messages) == 1 and questions:
+            # ReAct prompt: the last "Question:" line is the user input, the scratchpad follows it
+            self.usage.record("agent", prompt)
+            question = questions[-1]
+            trace = self.traces.get(question.group(1).strip())
+            steps = agent_steps(trace) if trace else [f"Final Answer: {self.default_answer}"]
+            step = prompt[question.end():].count("\nObservation:")
+            return steps[min(step, len(steps) - 1)]
+        self.usage.record("direct", prompt)
+        trace = self.traces.get(str(messages[-1].content).strip())
+        return trace['answer'] if trace else self.default_answer
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+def create_replay_llm(traces: List[Dict], latency: float, usage: LLMUsage) -> ReplayChatModel:
+    return ReplayChatModel(traces={trace['question']: trace for trace in traces}, latency=latency, usage=usage)
+
+
+class FakeToolBackends:
+    """Canned tool results with a fixed latency; counts calls that got past the tool cache"""
+
+    TOOL_NAMES = ["AI_ML_News_Search", "ArXiv_Research_Search", "AI_ML_Web_Search",
+                  "AI_ML_Wikipedia", "User_Documents_Search", "AI_ML_Research_Digest"]
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _result(self, name: str, query: str) -> str:
+        with self._lock:
+            self.calls[name] += 1
+        return (f"{name} results for '{query}':\n\n"
+                f"1. **Offline result about {query}**\n   Source: benchmark\n   URL: https://example.org/{name.lower()}\n")
+
+    def overrides(self) -> Dict[str, Tuple]:
+        """tool name -> (func, coroutine), as accepted by AIMLChatbot(tool_overrides=...)"""
+        def pair(name):
+            def func(query: str) -> str:
+                time.sleep(self.latency)
+                return self._result(name, query)
+
+            async def coroutine(query: str) -> str:
+                await asyncio.sleep(self.latency)
+                return self._result(name, query)
+            return func, coroutine
+        return {name: pair(name) for name in self.TOOL_NAMES}
+
+
+class HashingEmbedder:
+    """Bag-of-words hashing embedder with the sentence-transformers encode() surface.
+
+    Identical questions embed identically, so semantic cache hit rates stay
+    meaningful without downloading a model.
+    """
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, convert_to_numpy: bool = True, **kwargs):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                bucket = int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % self.dimension
+                vectors[row, bucket] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1.0, norms)
+        return vectors
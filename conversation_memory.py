@@ -0,0 +1,153 @@
+import concurrent.futures
+import threading
+from functools import lru_cache
+from typing import Dict, List, Any, Callable, Tuple
+
+import tiktoken
+
+from session_store import SessionStore
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a user and an AI/ML assistant.
+Extend the current summary with the new lines and return only the new summary, in at most {max_tokens} tokens.
+Keep names, preferences, and the AI/ML topics, papers and tools discussed.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+
+class TokenCounter:
+    """tiktoken-based counter; cl100k_base is a close enough proxy for the Groq-hosted models"""
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        # Assistant answers are re-counted on every turn; memoize by text
+        self.count = lru_cache(maxsize=4096)(self._count)
+
+    def _count(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+
+class ConversationMemory:
+    """Token-budgeted history with a rolling summary of older turns.
+
+    Prompts get the session summary plus as many of the newest messages as
+    fit in ``max_token_limit``. Once the stored history outgrows the budget
+    (or ``max_history`` messages), the oldest turns are folded into the
+    summary on a background thread, so prompt size stays flat. A fold goes
+    down to the ``low_water`` fraction of both limits, so the summarizer runs
+    every few turns rather than on every turn past the limit.
+    """
+
+    def __init__(self, store: SessionStore, summarize: Callable[[str], str],
+                 max_token_limit: int = 2000, max_history: int = 10, summary_max_tokens: int = 300,
+                 low_water: float = 0.5):
+        self.store = store
+        self.summarize = summarize
+        self.max_token_limit = max_token_limit
+        self.max_history = max_history
+        self.summary_max_tokens = summary_max_tokens
+        self.low_water = low_water
+        self.counter = TokenCounter()
+        self._folding = set()
+        self._folding_lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summarizer")
+
+    def _tokens(self, message: Dict) -> int:
+        return message.get("tokens") or self.counter.count(f"{message['role']}: {message['content']}")
+
+    def context(self, session_id: str) -> Tuple[str, List[Dict]]:
+        """(summary, newest messages) packed into the token budget"""
+        history, summary = self.store.get_session(session_id)
+        budget = self.max_token_limit - (self.counter.count(summary) if summary else 0)
+        packed = []
+        for message in reversed(history[-self.max_history:]):
+            cost = self._tokens(message)
+            if cost > budget:
+                break
+            budget -= cost
+            packed.append(message)
+        packed.reverse()
+        return summary, packed
+
+    def format(self, session_id: str) -> str:
+        """Render the packed context for the prompt's {history} slot"""
+        summary, messages = self.context(session_id)
+        lines = [f"{msg['role']}: {msg['content']}" for msg in messages]
+        if summary:
+            lines.insert(0, f"Summary of earlier conversation: {summary}")
+        return "\n".join(lines)
+
+    def record(self, session_id: str, user_input: str, output: str) -> None:
+        """Store an exchange, then fold old turns into the summary if the history outgrew its budget"""
+        messages = []
+        for role, content in (("user", user_input), ("assistant", output)):
+            message = {"role": role, "content": content}
+            # Token counts are stored with the message so they are computed once
+            message["tokens"] = self.counter.count(f"{role}: {content}")
+            messages.append(message)
+        self.store.append_messages(session_id, messages)
+        self._maybe_fold(session_id)
+
+    def _overflow(self, history: List[Dict], summary: str) -> int:
+        """How many of the oldest messages to fold: none until a limit is exceeded,
+        then enough to get back down to the low-water mark"""
+        budget = self.max_token_limit - (self.counter.count(summary) if summary else 0)
+        tokens = [self._tokens(message) for message in history]
+        total = sum(tokens)
+        if len(history) <= self.max_history and total <= budget:
+            return 0
+        # Whole exchanges, and at least the latest one, stay verbatim
+        keep = max(2, int(self.max_history * self.low_water) // 2 * 2)
+        drop = max(0, len(history) - keep)
+        total -= sum(tokens[:drop])
+        while total > budget * self.low_water and drop < len(history) - 2:
+            total -= tokens[drop]
+            drop += 1
+        return drop
+
+    def _maybe_fold(self, session_id: str) -> None:
+        history, summary = self.store.get_session(session_id)
+        if not self._overflow(history, summary):
+            return
+        with self._folding_lock:
+            if session_id in self._folding:
+                return
+            self._folding.add(session_id)
+        self._pool.submit(self._fold, session_id)
+
+    def _fold(self, session_id: str) -> None:
+        try:
+            history, summary = self.store.get_session(session_id)
+            drop = self._overflow(history, summary)
+            if not drop:
+                return
+            lines = "\n".join(f"{msg['role']}: {msg['content']}" for msg in history[:drop])
+            new_summary = self.summarize(SUMMARY_PROMPT.format(
+                max_tokens=self.summary_max_tokens, summary=summary or "(none)", lines=lines
+            )).strip()
+            # Appends since the read only add to the end, so dropping from the front is safe
+            self.store.fold(session_id, new_summary, drop)
+        except Exception as e:
+            print(f"Warning: could not summarize conversation history: {e}")
+        finally:
+            with self._folding_lock:
+                self._folding.discard(session_id)
+
+
+def create_conversation_memory(config: Dict[str, Any], store: SessionStore,
+                               summarize: Callable[[str], str]) -> ConversationMemory:
+    """Build the conversation memory from the `memory` config section"""
+    memory_config = config.get('memory', {})
+    return ConversationMemory(
+        store,
+        summarize,
+        max_token_limit=memory_config.get('max_token_limit', 2000),
+        max_history=memory_config.get('max_history', 10),
+        summary_max_tokens=memory_config.get('summary_max_tokens', 300),
+        low_water=memory_config.get('low_water', 0.5),
+    )
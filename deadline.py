@@ -0,0 +1,63 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import time
+from typing import Optional, Callable
+
+# Deadline of the request currently being answered; follows tasks and copied contexts
+current_deadline: contextvars.ContextVar = contextvars.ContextVar("current_deadline", default=None)
+
+BUDGET_EXHAUSTED_MESSAGE = "Skipped: the time budget for this question is used up. Answer with what you already have."
+TOOL_TIMEOUT_MESSAGE = "The search did not finish within the time budget. Answer with what you already have."
+
+
+class Deadline:
+    """Request-level time budget shared by the LLM calls and tool calls of one answer"""
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def get_deadline() -> Optional[Deadline]:
+    return current_deadline.get()
+
+
+def bound_tool(func: Callable[[str], str], pool: concurrent.futures.Executor) -> Callable[[str], str]:
+    """Stop waiting for a sync tool once the current request's deadline passes"""
+    def bounded(query: str) -> str:
+        deadline = get_deadline()
+        if deadline is None:
+            return func(query)
+        if deadline.expired():
+            return BUDGET_EXHAUSTED_MESSAGE
+        # copy_context so the tool (and anything it fans out to) sees the same deadline
+        future = pool.submit(contextvars.copy_context().run, func, query)
+        try:
+            return future.result(timeout=deadline.remaining())
+        except concurrent.futures.TimeoutError:
+            # Threads cannot be killed; drop the result if it ever arrives
+            future.cancel()
+            return TOOL_TIMEOUT_MESSAGE
+    return bounded
+
+
+def abound_tool(coroutine):
+    """Cancel an async tool that would run past the current request's deadline"""
+    async def bounded(query: str) -> str:
+        deadline = get_deadline()
+        if deadline is None:
+            return await coroutine(query)
+        if deadline.expired():
+            return BUDGET_EXHAUSTED_MESSAGE
+        try:
+            return await asyncio.wait_for(coroutine(query), deadline.remaining())
+        except asyncio.TimeoutError:
+            return TOOL_TIMEOUT_MESSAGE
+    return bounded
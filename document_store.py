@@ -0,0 +1,209 @@
+import concurrent.futures
+import hashlib
+import os
+import threading
+import uuid
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from semantic_cache import load_embedding_model
+
+# .docx has no pages; this many paragraphs are treated as one "page"
+DOCX_PARAGRAPHS_PER_PAGE = 40
+# Likewise for plain text / markdown lines
+TEXT_LINES_PER_PAGE = 80
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Content hash used to skip files that were already ingested"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, text) one page at a time so large files never sit in memory whole"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        for number, page in enumerate(reader.pages, 1):
+            yield number, page.extract_text() or ''
+    elif extension == '.docx':
+        import docx
+        paragraphs = []
+        number = 1
+        for paragraph in docx.Document(path).paragraphs:
+            paragraphs.append(paragraph.text)
+            if len(paragraphs) >= DOCX_PARAGRAPHS_PER_PAGE:
+                yield number, "\n".join(paragraphs)
+                paragraphs, number = [], number + 1
+        if paragraphs:
+            yield number, "\n".join(paragraphs)
+    elif extension in ('.txt', '.md'):
+        lines = []
+        number = 1
+        with open(path, encoding='utf-8', errors='replace') as file:
+            for line in file:
+                lines.append(line)
+                if len(lines) >= TEXT_LINES_PER_PAGE:
+                    yield number, "".join(lines)
+                    lines, number = [], number + 1
+        if lines:
+            yield number, "".join(lines)
+    else:
+        raise ValueError(f"Unsupported document type: {extension}")
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 150) -> List[str]:
+    """Split text into overlapping chunks, preferring to break on whitespace"""
+    text = " ".join(text.split())
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_size)
+        if end < len(text):
+            space = text.rfind(' ', start + chunk_size // 2, end)
+            if space > 0:
+                end = space
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        # Start the overlap on a word boundary
+        space = text.find(' ', start, end)
+        if space >= 0:
+            start = space + 1
+    return chunks
+
+
+class DocumentStore:
+    """Background ingestion of uploaded files into a persistent Chroma index, plus top-k retrieval"""
+
+    def __init__(self, index_path: str = "data/documents", collection: str = "user_documents",
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 chunk_size: int = 1000, chunk_overlap: int = 150, embed_batch_size: int = 64,
+                 workers: int = 2):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=index_path)
+        self.collection = self.client.get_or_create_collection(collection, metadata={"hnsw:space": "cosine"})
+        self.embedding_model_name = embedding_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = embed_batch_size
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doc-ingest")
+        self._jobs = {}
+        self._in_progress = set()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return load_embedding_model(self.embedding_model_name)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts, batch_size=self.embed_batch_size,
+                                 normalize_embeddings=True, convert_to_numpy=True).tolist()
+
+    def submit(self, path: str, filename: str, session_id: str) -> str:
+        """Queue a saved upload for ingestion and return its job id immediately.
+
+        Chunks are tagged with session_id and only ever retrieved for that session.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {"job_id": job_id, "filename": filename, "status": "queued", "chunks": 0,
+                                  "session_id": session_id}
+        self._pool.submit(self._ingest, job_id, path, filename, session_id)
+        return job_id
+
+    def job(self, job_id: str, session_id: str) -> Optional[Dict]:
+        """Status of an ingestion job, visible only to the session that submitted it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["session_id"] != session_id:
+                return None
+            return {key: value for key, value in job.items() if key != "session_id"}
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _ingest(self, job_id: str, path: str, filename: str, session_id: str) -> None:
+        in_progress_key = None
+        try:
+            content_hash = file_sha256(path)
+            # The same file uploaded by two sessions is indexed once for each
+            in_progress_key = (session_id, content_hash)
+            with self._lock:
+                duplicate = in_progress_key in self._in_progress
+                self._in_progress.add(in_progress_key)
+            if duplicate or self.collection.get(
+                    where={"$and": [{"session_id": session_id}, {"content_hash": content_hash}]}, limit=1)["ids"]:
+                self._update(job_id, status="duplicate")
+                if duplicate:
+                    in_progress_key = None  # the other job owns the in-progress marker
+                return
+            self._update(job_id, status="processing")
+
+            batch = []
+            chunk_count = 0
+            for page_number, page_text in iter_pages(path):
+                for chunk in chunk_text(page_text, self.chunk_size, self.chunk_overlap):
+                    batch.append((f"{session_id}:{content_hash}:{chunk_count}", chunk, {
+                        "filename": filename, "page": page_number, "content_hash": content_hash,
+                        "session_id": session_id
+                    }))
+                    chunk_count += 1
+                    if len(batch) >= self.embed_batch_size:
+                        self._upsert(batch)
+                        batch = []
+                        self._update(job_id, chunks=chunk_count)
+            if batch:
+                self._upsert(batch)
+            self._update(job_id, status="done", chunks=chunk_count)
+        except Exception as e:
+            print(f"Error ingesting document {filename}: {e}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            if in_progress_key is not None:
+                with self._lock:
+                    self._in_progress.discard(in_progress_key)
+
+    def _upsert(self, batch: List[Tuple[str, str, Dict]]) -> None:
+        ids, texts, metadatas = zip(*batch)
+        self.collection.upsert(ids=list(ids), documents=list(texts),
+                               metadatas=list(metadatas), embeddings=self._embed(list(texts)))
+
+    def search(self, query: str, session_id: str, k: int = 4) -> List[Dict]:
+        """Top-k chunks most similar to the query, from this session's uploads only"""
+        where = {"session_id": session_id}
+        if not self.collection.get(where=where, limit=1)["ids"]:
+            return []
+        result = self.collection.query(query_embeddings=self._embed([query]), n_results=k, where=where)
+        return [{
+            "text": text,
+            "filename": metadata.get("filename", ""),
+            "page": metadata.get("page"),
+            "score": 1 - distance,
+        } for text, metadata, distance in zip(result["documents"][0], result["metadatas"][0], result["distances"][0])]
+
+
+def create_document_store(config: Dict[str, Any]) -> Optional[DocumentStore]:
+    """Build the document store from the `documents` config section, or None when disabled"""
+    documents_config = config.get('documents', {})
+    if not documents_config.get('enabled', False):
+        return None
+    try:
+        return DocumentStore(
+            index_path=documents_config.get('index_path', 'data/documents'),
+            collection=documents_config.get('collection', 'user_documents'),
+            embedding_model=documents_config.get('embedding_model', 'sentence-transformers/all-MiniLM-L6-v2'),
+            chunk_size=documents_config.get('chunk_size', 1000),
+            chunk_overlap=documents_config.get('chunk_overlap', 150),
+            embed_batch_size=documents_config.get('embed_batch_size', 64),
+            workers=documents_config.get('workers', 2),
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize document store: {e}")
+        return None
@@ -0,0 +1,34 @@
+"""Gunicorn settings: load the app once in the master, then fork the workers.
+
+    gunicorn app:app
+
+The config, prompt, agent, tools and embedding model are built before the fork
+and shared copy-on-write; each worker then opens its own connections and
+starts its background threads (AIMLChatbot.after_fork).
+"""
+import gc
+import multiprocessing
+import os
+
+# Tells AIMLChatbot to hold back threads, sockets and the document index until after_fork()
+os.environ["CHATBOT_PRELOAD"] = "1"
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# /chat/stream holds a thread for the length of an answer
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+timeout = 120
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Keep the preloaded objects out of the collector's reach, so collections in a
+    # worker do not write to (and un-share) the master's pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import ai_ml_chatbot
+    if ai_ml_chatbot is not None:
+        ai_ml_chatbot.after_fork()
@@ -0,0 +1,227 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import Dict, Any, Callable, Tuple
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from deadline import get_deadline
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+DEFAULT_SETTINGS = {
+    'timeout_seconds': 10,
+    'max_attempts': 3,
+    'backoff_base_seconds': 0.5,
+    'backoff_max_seconds': 8,
+    'pool_size': 10,
+    'failure_threshold': 5,
+    'reset_timeout_seconds': 30,
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+class RetryableStatusError(Exception):
+    """An HTTP response with a status code that should be retried"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures; one trial call after the reset timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            # Half-open: let exactly one call probe the upstream
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """End a half-open trial that neither succeeded nor failed against the upstream"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class Upstream:
+    """Pooled sessions, timeouts, jittered exponential backoff and a circuit breaker for one upstream"""
+
+    def __init__(self, name: str, settings: Dict[str, Any]):
+        self.name = name
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.timeout = self.settings['timeout_seconds']
+        self.breaker = CircuitBreaker(self.settings['failure_threshold'], self.settings['reset_timeout_seconds'])
+        self.reset_connections()
+
+    def reset_connections(self) -> None:
+        """Fresh connection pools; also called after fork so workers never share sockets"""
+        pool_size = self.settings['pool_size']
+        self.session = requests.Session()
+        # pool_block caps concurrent connections per host instead of opening throwaway ones
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # httpx clients are bound to the loop they were first used on
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            pool_size = self.settings['pool_size']
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        ceiling = min(self.settings['backoff_max_seconds'], self.settings['backoff_base_seconds'] * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Delay before the next attempt, or None when out of attempts or time"""
+        if attempt + 1 >= self.settings['max_attempts']:
+            return None
+        delay = self._backoff(attempt)
+        deadline = get_deadline()
+        if deadline is not None and delay >= deadline.remaining():
+            return None
+        return delay
+
+    def call(self, func: Callable, *args, retry_on: Tuple = (Exception,), **kwargs):
+        """Call a blocking client function under this upstream's breaker and retry policy"""
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            try:
+                result = func(*args, **kwargs)
+            except retry_on as e:
+                self.breaker.record_failure()
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    raise
+                print(f"Warning: {self.name} call failed ({e}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, coroutine_factory: Callable, retry_on: Tuple = (Exception,)):
+        """Async variant of call; coroutine_factory builds a fresh awaitable per attempt"""
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            try:
+                result = await coroutine_factory()
+            except retry_on as e:
+                self.breaker.record_failure()
+                delay = self._retry_delay(attempt)
+                if delay is None:
+                    raise
+                print(f"Warning: {self.name} call failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the pooled session; transient failures are retried"""
+        def attempt():
+            response = self.session.get(url, timeout=self.timeout, **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableStatusError(response.status_code)
+            return response
+        return self.call(attempt, retry_on=(requests.ConnectionError, requests.Timeout, RetryableStatusError))
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        async def attempt():
+            response = await self._async_client().get(url, **kwargs)
+            if response.status_code in RETRYABLE_STATUS:
+                raise RetryableStatusError(response.status_code)
+            return response
+        return await self.acall(attempt, retry_on=(httpx.TransportError, RetryableStatusError))
+
+
+class UpstreamRegistry:
+    """One Upstream per configured external service, created on first use"""
+
+    def __init__(self, config: Dict[str, Any]):
+        http_config = config.get('http', {})
+        self.defaults = http_config.get('defaults', {})
+        self.upstream_settings = http_config.get('upstreams', {})
+        self._upstreams = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> Upstream:
+        with self._lock:
+            if name not in self._upstreams:
+                settings = dict(self.defaults, **(self.upstream_settings.get(name) or {}))
+                self._upstreams[name] = Upstream(name, settings)
+            return self._upstreams[name]
+
+    def reset_connections(self) -> None:
+        """Replace every upstream's connection pools (called after fork)"""
+        with self._lock:
+            for upstream in self._upstreams.values():
+                upstream.reset_connections()
+
+    def states(self) -> Dict[str, str]:
+        """Circuit breaker state per upstream"""
+        with self._lock:
+            return {name: upstream.breaker.state for name, upstream in self._upstreams.items()}
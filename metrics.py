@@ -0,0 +1,417 @@
+import contextvars
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Iterable, Optional, Set, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache lookups to full agent runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for a labelled metric family in the Prometheus text format"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) triples"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts, sum, count]
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+    """Process-wide set of metric families, rendered on demand for /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self, collected: Iterable[Metric] = ()) -> str:
+        """Text exposition of the registered metrics plus any built at scrape time"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics + list(collected)) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("chatbot_requests_total", "Chat requests by how they were answered", ("route",))
+REQUEST_SECONDS = REGISTRY.histogram("chatbot_request_duration_seconds", "End-to-end chat request time", ("route",))
+STAGE_SECONDS = REGISTRY.histogram("chatbot_stage_duration_seconds",
+                                   "Time in hot-path stages (topic filter, cache lookups, memory)", ("stage",))
+LLM_SECONDS = REGISTRY.histogram("chatbot_llm_call_duration_seconds", "Time per LLM call", ("route",))
+LLM_TOKENS = REGISTRY.counter("chatbot_llm_tokens_total", "LLM tokens by type", ("route", "type"))
+TOOL_SECONDS = REGISTRY.histogram("chatbot_tool_call_duration_seconds",
+                                  "Time per agent tool call, including cache and deadline guard", ("tool",))
+AGENT_ITERATIONS = REGISTRY.histogram("chatbot_agent_iterations", "ReAct steps per agent run",
+                                      buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15))
+SLOW_REQUESTS = REGISTRY.counter("chatbot_slow_requests_total", "Requests slower than metrics.slow_request_seconds")
+
+# Trace of the request currently being answered; follows tasks and copied contexts
+current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class RequestTrace:
+    """Timeline of one chat request: stage spans, token counts and agent iterations"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = None
+        self.spans = []
+        self.tokens = defaultdict(int)
+        self.iterations = 0
+        # Threads currently working for this request; the one that opened it stays for its whole life
+        self._threads = defaultdict(int, {threading.get_ident(): 1})
+        self._threads_lock = threading.Lock()
+
+    def enter_thread(self, thread_id: int) -> None:
+        with self._threads_lock:
+            self._threads[thread_id] += 1
+
+    def leave_thread(self, thread_id: int) -> None:
+        with self._threads_lock:
+            self._threads[thread_id] -= 1
+            if not self._threads[thread_id]:
+                del self._threads[thread_id]
+
+    def threads(self) -> Set[int]:
+        with self._threads_lock:
+            return set(self._threads)
+
+    def add_span(self, name: str, started: float, duration: float) -> None:
+        # list.append is atomic, so spans from tool threads need no lock
+        self.spans.append((name, started - self.started, duration))
+
+    def duration(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "route": self.route,
+            "seconds": round(self.duration(), 3),
+            "iterations": self.iterations,
+            "tokens": dict(self.tokens),
+            "spans": [{"name": name, "start_ms": round(offset * 1000, 1), "ms": round(duration * 1000, 1)}
+                      for name, offset, duration in sorted(self.spans, key=lambda span: span[1])],
+        }
+
+
+def get_trace() -> Optional[RequestTrace]:
+    return current_trace.get()
+
+
+@contextmanager
+def request_thread():
+    """Count the calling thread as serving the current request while the block runs,
+    so a sampled request's profiler includes it"""
+    trace = get_trace()
+    if trace is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    trace.enter_thread(thread_id)
+    try:
+        yield
+    finally:
+        trace.leave_thread(thread_id)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a hot-path stage into chatbot_stage_duration_seconds and the current trace"""
+    started = time.perf_counter()
+    try:
+        with request_thread():
+            yield
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, stage=name)
+        trace = get_trace()
+        if trace is not None:
+            trace.add_span(name, started, duration)
+
+
+def _record_tool(name: str, started: float) -> None:
+    duration = time.perf_counter() - started
+    TOOL_SECONDS.observe(duration, tool=name)
+    trace = get_trace()
+    if trace is not None:
+        trace.add_span(f"tool:{name}", started, duration)
+
+
+def timed_tool(name: str, func):
+    """Record each call of a sync tool in chatbot_tool_call_duration_seconds"""
+    def timed(query: str) -> str:
+        started = time.perf_counter()
+        try:
+            with request_thread():
+                return func(query)
+        finally:
+            _record_tool(name, started)
+    return timed
+
+
+def atimed_tool(name: str, coroutine):
+    """Async variant of timed_tool"""
+    async def timed(query: str) -> str:
+        started = time.perf_counter()
+        try:
+            return await coroutine(query)
+        finally:
+            _record_tool(name, started)
+    return timed
+
+
+class SamplingProfiler:
+    """Samples thread stacks at a fixed interval while one request runs.
+
+    ``threads`` returns the ids to sample on each tick (e.g. RequestTrace.threads);
+    without it every thread but the profiler's own is sampled.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 30,
+                 threads: Optional[Callable[[], Set[int]]] = None):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.threads = threads
+        self.stacks = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            wanted = self.threads() if self.threads is not None else None
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (wanted is not None and thread_id not in wanted):
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    names.append(f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                # Collapsed-stack format, root first, as flame graph tools expect
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        self._thread.join()
+        return dict(self.stacks)
+
+
+class RequestTracer:
+    """Opens a RequestTrace per request and exports it when the request ends.
+
+    Requests slower than ``slow_request_seconds`` are logged with their full
+    span timeline; a ``profile_sample_rate`` fraction of requests also run
+    under a SamplingProfiler whose hottest stacks are logged if they turn
+    out slow. The profiler samples only the threads serving the request: the
+    event-loop thread that opened it, plus tool and executor threads while
+    they work for it. The loop thread is shared, so its samples can include
+    other requests' coroutines.
+    """
+
+    def __init__(self, slow_request_seconds: float = 10.0, profile_sample_rate: float = 0.0,
+                 profile_interval: float = 0.005, profile_top_stacks: int = 15):
+        self.slow_request_seconds = slow_request_seconds
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_interval = profile_interval
+        self.profile_top_stacks = profile_top_stacks
+
+    @contextmanager
+    def request(self):
+        trace = RequestTrace()
+        token = current_trace.set(trace)
+        profiler = None
+        if self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate:
+            profiler = SamplingProfiler(self.profile_interval, threads=trace.threads).start()
+        try:
+            yield trace
+        except BaseException:
+            trace.route = trace.route or "error"
+            raise
+        finally:
+            current_trace.reset(token)
+            stacks = profiler.stop() if profiler is not None else None
+            self._finish(trace, stacks)
+
+    def _finish(self, trace: RequestTrace, stacks: Optional[Dict[str, int]]) -> None:
+        route = trace.route or "error"
+        duration = trace.duration()
+        REQUESTS.inc(route=route)
+        REQUEST_SECONDS.observe(duration, route=route)
+        if trace.iterations:
+            AGENT_ITERATIONS.observe(trace.iterations)
+        if self.slow_request_seconds and duration >= self.slow_request_seconds:
+            SLOW_REQUESTS.inc()
+            print(f"Slow request ({duration:.2f}s): {json.dumps(trace.summary())}")
+            if stacks:
+                hottest = sorted(stacks.items(), key=lambda item: item[1], reverse=True)[:self.profile_top_stacks]
+                print("Hottest stacks (samples of this request's threads; the event-loop thread is shared "
+                      "with concurrent requests):\n" + "\n".join(f"{count} {stack}" for stack, count in hottest))
+
+
+def stats_metrics(chatbot) -> List[Metric]:
+    """Scrape-time gauges/counters for the stats the chatbot's components already keep"""
+    metrics = []
+    if chatbot.router is not None:
+        decisions = Counter("chatbot_router_decisions_total", "Query router decisions", ("route",))
+        seconds = Counter("chatbot_router_answer_seconds_total", "Cumulative answer time per route", ("route",))
+        for route, values in chatbot.router.stats().items():
+            decisions.inc(values["count"], route=route)
+            seconds.inc(values["seconds"], route=route)
+        metrics += [decisions, seconds]
+    tool_cache = Counter("chatbot_tool_cache_events_total", "Tool result cache events", ("tool", "event"))
+    for tool, counters in chatbot.tool_cache.stats().items():
+        for event, count in counters.items():
+            tool_cache.inc(count, tool=tool, event=event)
+    metrics.append(tool_cache)
+    coalescing = Counter("chatbot_tool_singleflight_total",
+                         "Tool calls that ran an upstream fetch vs. joined one in flight", ("tool", "event"))
+    for tool, counters in chatbot.singleflight.stats().items():
+        for event, count in counters.items():
+            coalescing.inc(count, tool=tool, event=event)
+    metrics.append(coalescing)
+    if chatbot.response_cache is not None:
+        semantic = Gauge("chatbot_semantic_cache", "Semantic response cache counters and size", ("stat",))
+        for stat, value in chatbot.response_cache.stats().items():
+            semantic.set(value, stat=stat)
+        metrics.append(semantic)
+    admission_stats = chatbot.admission.stats()
+    if admission_stats:
+        admission = Gauge("chatbot_admission", "LLM run slot pool: active/waiting now, cumulative admitted/rejected",
+                          ("stat",))
+        for stat, value in admission_stats.items():
+            admission.set(value, stat=stat)
+        metrics.append(admission)
+    breakers = Gauge("chatbot_upstream_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+                     ("upstream",))
+    for upstream, state in chatbot.upstreams.states().items():
+        breakers.set({"closed": 0, "half-open": 1, "open": 2}.get(state, -1), upstream=upstream)
+    metrics.append(breakers)
+    sessions = Gauge("chatbot_sessions", "Conversation sessions held by the session store")
+    sessions.set(len(chatbot.sessions))
+    metrics.append(sessions)
+    return metrics
+
+
+def create_request_tracer(config: Dict[str, Any]) -> RequestTracer:
+    """Build the request tracer from the `metrics` config section"""
+    metrics_config = config.get('metrics', {})
+    profiler_config = metrics_config.get('profiler', {})
+    return RequestTracer(
+        slow_request_seconds=metrics_config.get('slow_request_seconds', 10),
+        profile_sample_rate=profiler_config.get('sample_rate', 0.0) if profiler_config.get('enabled', False) else 0.0,
+        profile_interval=profiler_config.get('interval_ms', 5) / 1000,
+        profile_top_stacks=profiler_config.get('top_stacks', 15),
+    )
@@ -0,0 +1,272 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, every process prefetches
+    fcntl = None
+
+# Words that say "give me recent items" rather than what the items are about;
+# also used to build arXiv search queries
+GENERIC_QUERY_WORDS = {
+    'latest', 'recent', 'recently', 'new', 'newest', 'news', 'today', 'current', 'update', 'updates',
+    'trend', 'trends', 'developments', 'advances', 'work', 'week', 'month', 'year',
+    'about', 'on', 'in', 'the', 'a', 'an', 'of', 'to', 'from', 'with', 'by', 'at', 'into',
+    'and', 'or', 'for', 'what', 'whats', 'which', 'how', 'is', 'are', 'was', 'were', 'been',
+    'there', 'any', 'some', 'me', 'my', 'i', 'you', 'can', 'do', 'does', 'please', 'show',
+    'give', 'tell', 'find', 'list', 'search', 'ai', 'ml', 'artificial', 'intelligence',
+    'machine', 'learning', 'research', 'paper', 'papers', 'study', 'studies', 'arxiv',
+}
+
+
+def _to_timestamp(value: Any) -> Optional[float]:
+    """Best-effort conversion of feed/GNews/arXiv dates to a Unix timestamp"""
+    if not value:
+        return None
+    if isinstance(value, time.struct_time):
+        return time.mktime(value)
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def query_words(query: Optional[str]) -> List[str]:
+    """Topical words of a search query, as typed: possessives and edge punctuation stripped,
+    generic words and one-character fragments dropped"""
+    words = []
+    for word in re.findall(r"[\w.-]+", re.sub(r"['’]s\b", "", query or "")):
+        word = word.strip(".-")
+        if len(word) >= 2 and word.lower() not in GENERIC_QUERY_WORDS:
+            words.append(word)
+    return words
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """FTS5 MATCH expression requiring every topical word of the query"""
+    # A word the tokenizer splits ("gpt-4") becomes a phrase of its parts
+    phrases = [" ".join(re.findall(r"[a-z0-9]+", word.lower())) for word in query_words(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    if not phrases:
+        return None
+    return " ".join(f'"{phrase}"' for phrase in phrases)
+
+
+class NewsIndex:
+    """Deduplicated local store of news items and papers with a full-text index"""
+
+    def __init__(self, path: str = "data/news_index.db"):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL DEFAULT '',
+                source TEXT NOT NULL DEFAULT '',
+                published TEXT NOT NULL DEFAULT '',
+                published_ts REAL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_kind_time ON items(kind, published_ts);
+        """)
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS items_fts
+                    USING fts5(title, summary, content='items', content_rowid='id');
+                CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+                    INSERT INTO items_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+                    INSERT INTO items_fts(items_fts, rowid, title, summary)
+                        VALUES ('delete', old.id, old.title, old.summary);
+                END;
+            """)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE scans
+            print("Warning: SQLite FTS5 unavailable, news index will use LIKE search")
+            self.has_fts = False
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self) -> None:
+        """Drop connections inherited from a parent process (called after fork)"""
+        self._local = threading.local()
+
+    def upsert(self, kind: str, items: List[Dict]) -> int:
+        """Insert items not already indexed (deduplicated by URL); returns the number added"""
+        now = time.time()
+        rows = [
+            (kind, item['url'], item.get('title', ''), item.get('summary') or item.get('description', ''),
+             item.get('source', ''), item.get('published', ''),
+             _to_timestamp(item.get('published')), now)
+            for item in items if item.get('url') and item.get('title')
+        ]
+        conn = self._conn()
+        with conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO items (kind, url, title, summary, source, published, published_ts, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return max(cursor.rowcount, 0)
+
+    def search(self, kind: str, query: Optional[str], limit: int = 5,
+               max_age_seconds: Optional[float] = None) -> List[Dict]:
+        """Return indexed items matching query, or the newest items for generic queries"""
+        cutoff = time.time() - max_age_seconds if max_age_seconds else 0
+        freshness = "COALESCE(items.published_ts, items.fetched_at) >= ?"
+        expression = _match_expression(query)
+        conn = self._conn()
+        if expression is None:
+            rows = conn.execute(
+                f"SELECT * FROM items WHERE kind = ? AND {freshness} "
+                "ORDER BY COALESCE(published_ts, fetched_at) DESC LIMIT ?",
+                (kind, cutoff, limit)
+            ).fetchall()
+        elif self.has_fts:
+            rows = conn.execute(
+                "SELECT items.* FROM items_fts JOIN items ON items.id = items_fts.rowid "
+                f"WHERE items_fts MATCH ? AND items.kind = ? AND {freshness} "
+                "ORDER BY bm25(items_fts) LIMIT ?",
+                (expression, kind, cutoff, limit)
+            ).fetchall()
+        else:
+            terms = [term.strip('"') for term in expression.split()]
+            clauses = " AND ".join("(title LIKE ? OR summary LIKE ?)" for _ in terms)
+            params = [value for term in terms for value in (f"%{term}%", f"%{term}%")]
+            rows = conn.execute(
+                f"SELECT * FROM items WHERE kind = ? AND {freshness} AND {clauses} "
+                "ORDER BY COALESCE(published_ts, fetched_at) DESC LIMIT ?",
+                [kind, cutoff] + params + [limit]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Drop items older than the retention window"""
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute("DELETE FROM items WHERE fetched_at < ?", (time.time() - max_age_seconds,))
+        return cursor.rowcount
+
+
+class NewsPrefetcher:
+    """Background ingester that keeps the news index warm.
+
+    Every worker process starts one, but only the holder of an exclusive lock
+    on ``<index path>.prefetch.lock`` sweeps the sources. The others retry the
+    lock each interval, so one of them takes over if the holder exits.
+    """
+
+    def __init__(self, index: NewsIndex, retriever, config: Dict):
+        self.index = index
+        self.retriever = retriever
+        self.news_config = config.get('news', {})
+        self.prefetch_config = config.get('prefetch', {})
+        self.lock_path = f"{index.path}.prefetch.lock"
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _claim(self) -> bool:
+        """Take (or keep) the host-wide prefetch lock without blocking"""
+        if fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held for the life of the process; the OS releases it when the process exits
+        self._lock_file = lock_file
+        return True
+
+    def _feed_items(self, name: str, url: str) -> List[Dict]:
+        import feedparser
+        # Fetch through the pooled feeds upstream, then let feedparser parse the bytes
+        response = self.retriever.upstreams['feeds'].get(url)
+        response.raise_for_status()
+        feed = feedparser.parse(response.content)
+        return [{
+            'title': entry.get('title', ''),
+            'description': re.sub(r'<[^>]+>', '', entry.get('summary', ''))[:500],
+            'url': entry.get('link', ''),
+            'published': entry.get('published', entry.get('updated', '')),
+            'source': name,
+        } for entry in feed.entries]
+
+    def run_once(self) -> Dict[str, int]:
+        """Pull every configured source once; returns new items per source"""
+        added = {}
+        feeds = self.news_config.get('feeds', {})
+        for name in self.news_config.get('sources', []):
+            if name not in feeds:
+                continue
+            try:
+                added[name] = self.index.upsert('news', self._feed_items(name, feeds[name]))
+            except Exception as e:
+                print(f"Warning: prefetch of feed {name} failed: {e}")
+        for category in self.news_config.get('categories', []):
+            try:
+                items = self.retriever.fetch_live_news(category.replace('-', ' '))
+                added[category] = self.index.upsert('news', items)
+            except Exception as e:
+                print(f"Warning: prefetch of news category {category} failed: {e}")
+        per_category = self.prefetch_config.get('arxiv_per_category', 50)
+        for category in self.prefetch_config.get('arxiv_categories', []):
+            try:
+                # Upsert page-sized batches as papers stream in, so sweeps run in constant memory
+                added[category] = 0
+                batch = []
+                for paper in self.retriever.iter_arxiv_category(category, per_category):
+                    batch.append(paper.to_dict())
+                    if len(batch) >= 100:
+                        added[category] += self.index.upsert('paper', batch)
+                        batch = []
+                added[category] += self.index.upsert('paper', batch)
+            except Exception as e:
+                print(f"Warning: prefetch of arXiv {category} failed: {e}")
+        self.index.prune(self.prefetch_config.get('retention_days', 14) * 86400)
+        return added
+
+    def _run(self):
+        interval = self.prefetch_config.get('interval_minutes', 15) * 60
+        while not self._stop.is_set():
+            if self._claim():
+                self.run_once()
+            self._stop.wait(interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="news-prefetcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,52 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Any
+
+# Phrases that signal the question needs current or external data
+DEFAULT_TOOL_TRIGGERS = [
+    r"latest", r"recent(?:ly)?", r"new(?:est)?", r"today", r"tonight", r"yesterday",
+    r"this (?:week|month|year)", r"current(?:ly)?", r"right now", r"breaking", r"upcoming",
+    r"news", r"headlines?", r"updates?", r"announce(?:d|ment|ments)?", r"launch(?:ed|es)?",
+    r"release(?:d|s)?", r"trend(?:s|ing)?", r"20[2-9]\d",
+    r"papers?", r"arxiv", r"preprints?", r"publications?", r"studies", r"state of the art", r"sota",
+    r"(?:my|uploaded) (?:documents?|files?|pdfs?|notes|uploads?)", r"uploaded",
+    r"search", r"look up", r"find", r"links?", r"urls?", r"sources?", r"pric(?:e|es|ing)", r"github",
+]
+
+
+class QueryRouter:
+    """Routes a question to a single direct LLM call or to the full tool agent"""
+
+    DIRECT = "direct"
+    AGENT = "agent"
+
+    def __init__(self, tool_triggers: List[str] = None):
+        triggers = tool_triggers or DEFAULT_TOOL_TRIGGERS
+        # One compiled alternation, built once: a single pass over the query
+        self._tool_pattern = re.compile(r"\b(?:" + "|".join(f"(?:{t})" for t in triggers) + r")\b", re.IGNORECASE)
+        self._stats = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        self._lock = threading.Lock()
+
+    def route(self, query: str) -> str:
+        route = self.AGENT if self._tool_pattern.search(query) else self.DIRECT
+        with self._lock:
+            self._stats[route]["count"] += 1
+        return route
+
+    def record_latency(self, route: str, seconds: float) -> None:
+        with self._lock:
+            self._stats[route]["seconds"] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Decision counts and cumulative answer time per route"""
+        with self._lock:
+            return {route: dict(values) for route, values in self._stats.items()}
+
+
+def create_query_router(config: Dict[str, Any]):
+    """Build the router from the `router` config section, or None when disabled"""
+    router_config = config.get('router', {})
+    if not router_config.get('enabled', False):
+        return None
+    return QueryRouter(router_config.get('tool_triggers'))
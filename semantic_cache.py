@@ -0,0 +1,162 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+_models = {}
+_models_lock = threading.Lock()
+
+# Words that make a question lean on earlier turns ("why is that?", "tell me more about it")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|that|those|these|they|them|their|he|she|him|her|above|earlier|previous|previously|"
+    r"again|else|more|same|former|latter|you said|your answer|last answer|instead)\b"
+)
+
+
+def is_follow_up(question: str) -> bool:
+    """Whether the question may refer back to the conversation, so its answer depends on the session"""
+    words = question.split()
+    # Fragments like "and GRU?" or "why?" only make sense after an earlier turn
+    return len(words) <= 2 or bool(FOLLOW_UP_PATTERN.search(question.lower()))
+
+
+def load_embedding_model(model_name: str):
+    """Load a sentence-transformers model once per process and share it"""
+    with _models_lock:
+        if model_name not in _models:
+            from sentence_transformers import SentenceTransformer
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
+class SemanticResponseCache:
+    """Embedding-keyed answer cache backed by a preallocated NumPy matrix.
+
+    A question hits when its cosine similarity to a live cached question is
+    at least ``threshold``. Answers that relied on tools get the shorter
+    ``tool_ttl`` because they describe time-sensitive data. When full, an
+    expired slot is reused, otherwise the least recently used one.
+
+    ``lookup_or_claim`` also tracks questions being answered right now, so a
+    near-duplicate arriving meanwhile waits for that answer instead of paying
+    for its own LLM call.
+    """
+
+    def __init__(self, model, threshold: float = 0.92, max_entries: int = 2000,
+                 ttl_seconds: float = 86400, tool_ttl_seconds: float = 600):
+        self.model = model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tool_ttl_seconds = tool_ttl_seconds
+        dimension = model.get_sentence_embedding_dimension()
+        self._vectors = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._size = 0
+        self._lock = threading.Lock()
+        # (event loop, vector, future) per question being answered; futures belong to one loop
+        self._in_flight = []
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "waits": 0}
+
+    def embed(self, question: str) -> np.ndarray:
+        """Unit-length embedding, so a dot product is the cosine similarity"""
+        return self.model.encode([question], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+
+    def lookup(self, vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            answer = self._lookup(vector)
+            self._stats["hits" if answer is not None else "misses"] += 1
+            return answer
+
+    def _lookup(self, vector: np.ndarray) -> Optional[str]:
+        # Called with self._lock held
+        if not self._size:
+            return None
+        now = time.time()
+        scores = self._vectors[:self._size] @ vector
+        scores[self._expires_at[:self._size] <= now] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        self._last_used[best] = now
+        return self._answers[best]
+
+    def lookup_or_claim(self, vector: np.ndarray) -> Tuple[Optional[str], Optional[asyncio.Future]]:
+        """(answer, None) on a hit; (None, future) while a near-duplicate is being answered on
+        this event loop, so wait for the future and ask again; (None, None) on a miss, which
+        claims the question: the caller answers it and must call release(vector) afterwards.
+
+        Only the final hit or miss of each question is counted, so the hit rate does not
+        depend on how requests for the same question happen to overlap.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for owner, pending, future in self._in_flight:
+                if owner is loop and float(pending @ vector) >= self.threshold:
+                    self._stats["waits"] += 1
+                    return None, future
+            answer = self._lookup(vector)
+            if answer is not None:
+                self._stats["hits"] += 1
+                return answer, None
+            self._stats["misses"] += 1
+            self._in_flight.append((loop, vector, loop.create_future()))
+            return None, None
+
+    def release(self, vector: np.ndarray) -> None:
+        """End a claim from lookup_or_claim; callers waiting on it look up again"""
+        with self._lock:
+            for index, (_, pending, future) in enumerate(self._in_flight):
+                if pending is vector:
+                    del self._in_flight[index]
+                    break
+            else:
+                return
+        future.set_result(None)
+
+    def store(self, vector: np.ndarray, answer: str, used_tools: bool = False) -> None:
+        now = time.time()
+        ttl = self.tool_ttl_seconds if used_tools else self.ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                expired = np.flatnonzero(self._expires_at <= now)
+                slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+                self._stats["evictions"] += 1
+            self._vectors[slot] = vector
+            self._expires_at[slot] = now + ttl
+            self._last_used[slot] = now
+            self._answers[slot] = answer
+            self._stats["stores"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, size=self._size)
+
+
+def create_semantic_cache(config: Dict[str, Any]) -> Optional[SemanticResponseCache]:
+    """Build the semantic response cache, or None when disabled or unavailable"""
+    cache_config = config.get('semantic_cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+    try:
+        model = load_embedding_model(cache_config.get('model', 'sentence-transformers/all-MiniLM-L6-v2'))
+    except Exception as e:
+        print(f"Warning: Could not initialize semantic cache: {e}")
+        return None
+    return SemanticResponseCache(
+        model,
+        threshold=cache_config.get('similarity_threshold', 0.92),
+        max_entries=cache_config.get('max_entries', 2000),
+        ttl_seconds=cache_config.get('ttl_seconds', 86400),
+        tool_ttl_seconds=cache_config.get('tool_ttl_seconds', 600),
+    )
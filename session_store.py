@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+
+
+class SessionStore:
+    """Base class for session-keyed conversation history stores"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600, max_history: int = 20):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_history = max_history
+
+    def get_history(self, session_id: str) -> List[Dict]:
+        """Return a copy of the session's chat history (oldest first)"""
+        return self.get_session(session_id)[0]
+
+    def get_session(self, session_id: str) -> Tuple[List[Dict], str]:
+        """Return (history, summary) where summary covers turns already folded out of history"""
+        raise NotImplementedError
+
+    def fold(self, session_id: str, summary: str, drop_count: int) -> None:
+        """Replace the summary and drop the oldest drop_count messages it now covers"""
+        raise NotImplementedError
+
+    def append_messages(self, session_id: str, messages: List[Dict]) -> None:
+        """Append messages to the session's history, keeping it bounded"""
+        raise NotImplementedError
+
+    def clear(self, session_id: str) -> None:
+        """Forget a session"""
+        raise NotImplementedError
+
+    def reset_connections(self) -> None:
+        """Drop connections inherited from a parent process (called after fork)"""
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class _Shard:
+    """One independently locked slice of the in-memory store"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # session_id -> (last_access, history, summary)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU/TTL session store, sharded to keep lock hold times short"""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600,
+                 max_history: int = 20, shards: int = 16):
+        super().__init__(max_sessions, ttl_seconds, max_history)
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._per_shard_limit = max(1, max_sessions // len(self._shards))
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def _evict(self, shard: _Shard, now: float) -> None:
+        # Entries are kept in access order, so expired ones sit at the front
+        while shard.sessions:
+            oldest_id, (last_access, _, _) = next(iter(shard.sessions.items()))
+            if now - last_access > self.ttl_seconds or len(shard.sessions) > self._per_shard_limit:
+                del shard.sessions[oldest_id]
+            else:
+                break
+
+    def get_session(self, session_id: str) -> Tuple[List[Dict], str]:
+        shard = self._shard(session_id)
+        now = time.time()
+        with shard.lock:
+            entry = shard.sessions.get(session_id)
+            if entry is None:
+                return [], ""
+            if now - entry[0] > self.ttl_seconds:
+                del shard.sessions[session_id]
+                return [], ""
+            shard.sessions[session_id] = (now, entry[1], entry[2])
+            shard.sessions.move_to_end(session_id)
+            return list(entry[1]), entry[2]
+
+    def _live_entry(self, shard: _Shard, session_id: str, now: float) -> Tuple[List[Dict], str]:
+        entry = shard.sessions.pop(session_id, None)
+        if entry is None or now - entry[0] > self.ttl_seconds:
+            return [], ""
+        return entry[1], entry[2]
+
+    def append_messages(self, session_id: str, messages: List[Dict]) -> None:
+        shard = self._shard(session_id)
+        now = time.time()
+        with shard.lock:
+            history, summary = self._live_entry(shard, session_id, now)
+            history = (history + list(messages))[-self.max_history:]
+            shard.sessions[session_id] = (now, history, summary)
+            self._evict(shard, now)
+
+    def fold(self, session_id: str, summary: str, drop_count: int) -> None:
+        shard = self._shard(session_id)
+        now = time.time()
+        with shard.lock:
+            history, _ = self._live_entry(shard, session_id, now)
+            shard.sessions[session_id] = (now, history[drop_count:], summary)
+            self._evict(shard, now)
+
+    def clear(self, session_id: str) -> None:
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store backed by a local SQLite file, shared across worker processes"""
+
+    # Run the (comparatively expensive) LRU/TTL sweep once every N writes
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path: str = "data/sessions.db", max_sessions: int = 10000,
+                 ttl_seconds: float = 3600, max_history: int = 20):
+        super().__init__(max_sessions, ttl_seconds, max_history)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._write_count = 0
+        self._count_lock = threading.Lock()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, history TEXT NOT NULL, updated_at REAL NOT NULL, "
+            "summary TEXT NOT NULL DEFAULT '')"
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if 'summary' not in columns:
+            # Session files written before summaries existed
+            conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers proceed during writes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self) -> None:
+        # A forked child must not reuse the parent's SQLite handles
+        self._local = threading.local()
+
+    def get_session(self, session_id: str) -> Tuple[List[Dict], str]:
+        row = self._conn().execute(
+            "SELECT history, updated_at, summary FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return [], ""
+        return json.loads(row[0]), row[2]
+
+    def append_messages(self, session_id: str, messages: List[Dict]) -> None:
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            # BEGIN IMMEDIATE serialises concurrent appends to the same session
+            conn.execute("BEGIN IMMEDIATE")
+            history, summary = self._locked_entry(conn, session_id, now)
+            history = (history + list(messages))[-self.max_history:]
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, history, updated_at, summary) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(history), now, summary)
+            )
+        self._maybe_evict(now)
+
+    def _locked_entry(self, conn: sqlite3.Connection, session_id: str, now: float) -> Tuple[List[Dict], str]:
+        row = conn.execute(
+            "SELECT history, updated_at, summary FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            return [], ""
+        return json.loads(row[0]), row[2]
+
+    def fold(self, session_id: str, summary: str, drop_count: int) -> None:
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            history, _ = self._locked_entry(conn, session_id, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, history, updated_at, summary) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(history[drop_count:]), now, summary)
+            )
+
+    def _maybe_evict(self, now: float) -> None:
+        with self._count_lock:
+            self._write_count += 1
+            if self._write_count % self.EVICTION_INTERVAL:
+                return
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+
+    def clear(self, session_id: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(config: Dict[str, Any]) -> SessionStore:
+    """Build the session store selected by the `session` config section"""
+    session_config = config.get('session', {})
+    backend = session_config.get('backend', 'memory')
+    kwargs = {
+        'max_sessions': session_config.get('max_sessions', 10000),
+        'ttl_seconds': session_config.get('ttl_seconds', 3600),
+        'max_history': session_config.get('max_history', 20),
+    }
+    if backend == 'sqlite':
+        return SQLiteSessionStore(path=session_config.get('sqlite_path', 'data/sessions.db'), **kwargs)
+    if backend == 'memory':
+        return MemorySessionStore(**kwargs)
+    raise ValueError(f"Unknown session backend: {backend}")
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Any, Callable
+
+from tool_cache import normalize_query
+
+
+class _Call:
+    """One in-flight sync execution that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent tool calls with the same normalized query into one upstream fetch.
+
+    The first caller for a key (the leader) runs the fetch; callers arriving
+    while it is in flight wait for and share its result or exception.
+    Nothing is remembered once the fetch finishes, that is the tool cache's job.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # (event loop, key) -> task; asyncio futures belong to one loop
+        self._tasks = {}
+        self._stats = defaultdict(lambda: defaultdict(int))
+
+    @staticmethod
+    def _key(tool_name: str, query: str) -> str:
+        return f"{tool_name}:{normalize_query(query)}"
+
+    def _count(self, tool_name: str, counter: str) -> None:
+        # Called with self._lock held
+        self._stats[tool_name][counter] += 1
+
+    def do(self, tool_name: str, query: str, func: Callable[[str], str]) -> str:
+        key = self._key(tool_name, query)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(tool_name, "fetches" if leader else "coalesced")
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(query)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, tool_name: str, query: str, coroutine) -> str:
+        key = (asyncio.get_running_loop(), self._key(tool_name, query))
+        with self._lock:
+            task = self._tasks.get(key)
+            leader = task is None
+            if leader:
+                # A task of its own, so the leader being cancelled at its deadline
+                # does not cancel the fetch the followers are waiting for
+                task = self._tasks[key] = asyncio.ensure_future(coroutine(query))
+                task.add_done_callback(lambda _: self._forget(key))
+            self._count(tool_name, "fetches" if leader else "coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key) -> None:
+        with self._lock:
+            self._tasks.pop(key, None)
+
+    def wrap(self, tool_name: str, func: Callable[[str], str]) -> Callable[[str], str]:
+        """Wrap a sync tool function so identical concurrent calls share one fetch"""
+        def coalesced(query: str) -> str:
+            return self.do(tool_name, query, func)
+        return coalesced
+
+    def awrap(self, tool_name: str, coroutine):
+        """Wrap an async tool function so identical concurrent calls share one fetch"""
+        async def coalesced(query: str) -> str:
+            return await self.ado(tool_name, query, coroutine)
+        return coalesced
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Upstream fetches vs. calls that joined an in-flight fetch, per tool"""
+        with self._lock:
+            return {tool: dict(counters) for tool, counters in self._stats.items()}
+
+
+class _Passthrough:
+    """Stand-in when coalescing is disabled"""
+
+    def wrap(self, tool_name: str, func):
+        return func
+
+    def awrap(self, tool_name: str, coroutine):
+        return coroutine
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+
+def create_single_flight(config: Dict[str, Any]):
+    """Build the coalescer from the `singleflight` config section"""
+    if not config.get('singleflight', {}).get('enabled', True):
+        return _Passthrough()
+    return SingleFlight()
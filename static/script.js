@@ -64,6 +64,7 @@ document.addEventListener('DOMContentLoaded', () => {
         
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return messageContent;
     }
 
     function formatAIMLMessage(message) {
@@ -101,8 +102,23 @@ document.addEventListener('DOMContentLoaded', () => {
         chatMessages.appendChild(typingIndicator);
         chatMessages.scrollTop = chatMessages.scrollHeight;
 
+        function removeTypingIndicator() {
+            if (typingIndicator.parentNode) {
+                chatMessages.removeChild(typingIndicator);
+            }
+        }
+
+        function playWarningIfNeeded(data) {
+            // Play warning sound if needed
+            if (data.play_warning) {
+                warningSound.play().catch(error => {
+                    console.error('Error playing warning sound:', error);
+                });
+            }
+        }
+
         try {
-            const response = await fetch('/chat', {
+            const response = await fetch('/chat/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -110,32 +126,80 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify({ message: message }),
             });
 
+            if (response.status === 429 || response.status === 503) {
+                // Rate limited or overloaded: the body carries a user-facing message
+                const data = await response.json();
+                removeTypingIndicator();
+                addMessage(data.response, false);
+                return;
+            }
+
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
-            
-            // Remove typing indicator
-            if (typingIndicator.parentNode) {
-                chatMessages.removeChild(typingIndicator);
+            // Read Server-Sent Events from the response body as they arrive
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let streamedText = '';
+            let botMessageContent = null;
+            let finished = false;
+
+            function handleEvent(data) {
+                if (data.type === 'step') {
+                    const typingText = typingIndicator.querySelector('.typing-text');
+                    if (typingText) {
+                        typingText.textContent = data.content;
+                    }
+                } else if (data.type === 'token') {
+                    removeTypingIndicator();
+                    streamedText += data.content;
+                    if (!botMessageContent) {
+                        botMessageContent = addMessage(streamedText, false);
+                    } else {
+                        botMessageContent.innerHTML = formatAIMLMessage(streamedText);
+                    }
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                } else if (data.type === 'final') {
+                    removeTypingIndicator();
+                    // The final event carries the authoritative answer text
+                    if (!botMessageContent) {
+                        addMessage(data.response, false);
+                    } else {
+                        botMessageContent.innerHTML = formatAIMLMessage(data.response);
+                    }
+                    playWarningIfNeeded(data);
+                    finished = true;
+                }
             }
-            
-            // Add bot response
-            addMessage(data.response, false);
 
-            // Play warning sound if needed
-            if (data.play_warning) {
-                warningSound.play().catch(error => {
-                    console.error('Error playing warning sound:', error);
-                });
+            while (!finished) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const rawEvent = buffer.slice(0, boundary);
+                    buffer = buffer.slice(boundary + 2);
+                    const dataLines = rawEvent
+                        .split('\n')
+                        .filter(line => line.startsWith('data:'))
+                        .map(line => line.slice(5).trim());
+                    if (dataLines.length) {
+                        handleEvent(JSON.parse(dataLines.join('\n')));
+                    }
+                }
+            }
+
+            if (!finished) {
+                throw new Error('Stream ended before the final answer');
             }
 
         } catch (error) {
             console.error('Error:', error);
-            if (typingIndicator.parentNode) {
-                chatMessages.removeChild(typingIndicator);
-            }
+            removeTypingIndicator();
             addMessage('I apologize, but I encountered an error processing your AI/ML query. Please check your connection and try again.', false);
         } finally {
             sendButton.disabled = false;
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Optional, Any, Callable, Tuple
+
+from metrics import stage
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a tool query so trivially different phrasings share a cache entry"""
+    query = re.sub(r"\s+", " ", str(query).lower()).strip()
+    return query.strip(" \"'.,;:!?")
+
+
+class Uncacheable(str):
+    """A tool reply that is returned to the agent but never cached.
+
+    Tools mark empty replies, and replies degraded by an upstream failure,
+    with this type; outright failures are raised instead.
+    """
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache backend"""
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def reset_connections(self) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend:
+    """SQLite-file cache backend, shared by every worker process on the host"""
+
+    def __init__(self, path: str = "data/tool_cache.db", max_entries: int = 50000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tool_cache_stored ON tool_cache(stored_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reset_connections(self) -> None:
+        """Drop connections inherited from a parent process (called after fork)"""
+        self._local = threading.local()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        row = self._conn().execute(
+            "SELECT value, stored_at FROM tool_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, value: str, stored_at: float) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), stored_at)
+            )
+            # Oldest entries go first once the file is over its size bound
+            conn.execute(
+                "DELETE FROM tool_cache WHERE key IN ("
+                "SELECT key FROM tool_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM tool_cache").fetchone()[0]
+
+
+class ToolResultCache:
+    """TTL cache for tool results with stale-while-revalidate.
+
+    Entries younger than the tool's ``ttl`` are fresh hits. Entries within a
+    further ``stale_ttl`` are returned immediately while a background refresh
+    replaces them. Anything older is a miss.
+    """
+
+    def __init__(self, backend, tool_settings: Dict[str, Dict] = None,
+                 default_ttl: float = 300, default_stale_ttl: float = 0):
+        self.backend = backend
+        self.tool_settings = tool_settings or {}
+        self.default_ttl = default_ttl
+        self.default_stale_ttl = default_stale_ttl
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._tasks = set()
+        self._stats = defaultdict(lambda: defaultdict(int))
+        self._stats_lock = threading.Lock()
+
+    def _ttls(self, tool_name: str) -> Tuple[float, float]:
+        settings = self.tool_settings.get(tool_name, {})
+        return (settings.get('ttl', self.default_ttl),
+                settings.get('stale_ttl', self.default_stale_ttl))
+
+    def _count(self, tool_name: str, counter: str) -> None:
+        with self._stats_lock:
+            self._stats[tool_name][counter] += 1
+
+    @staticmethod
+    def _key(tool_name: str, query: str) -> str:
+        return f"{tool_name}:{normalize_query(query)}"
+
+    @staticmethod
+    def _cacheable(value: Any) -> bool:
+        return isinstance(value, str) and not isinstance(value, Uncacheable) and bool(value.strip())
+
+    def lookup(self, tool_name: str, query: str) -> Tuple[Optional[str], str]:
+        """Return (value, state) where state is "fresh", "stale" or "miss" """
+        ttl, stale_ttl = self._ttls(tool_name)
+        if ttl <= 0:
+            return None, "miss"
+        with stage("tool_cache_lookup"):
+            entry = self.backend.get(self._key(tool_name, query))
+        if entry is None:
+            return None, "miss"
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age <= ttl:
+            return value, "fresh"
+        if age <= ttl + stale_ttl:
+            return value, "stale"
+        return None, "miss"
+
+    def store(self, tool_name: str, query: str, value: Any) -> None:
+        if self._cacheable(value) and self._ttls(tool_name)[0] > 0:
+            self.backend.set(self._key(tool_name, query), value, time.time())
+
+    def _claim_refresh(self, key: str) -> bool:
+        """Only one background refresh per key at a time"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _release_refresh(self, key: str) -> None:
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    def get_or_compute(self, tool_name: str, query: str, compute: Callable[[str], str]) -> str:
+        value, state = self.lookup(tool_name, query)
+        if state == "fresh":
+            self._count(tool_name, "hits")
+            return value
+        if state == "stale":
+            self._count(tool_name, "stale_hits")
+            key = self._key(tool_name, query)
+            if self._claim_refresh(key):
+                def refresh():
+                    try:
+                        self.store(tool_name, query, compute(query))
+                        self._count(tool_name, "refreshes")
+                    except Exception as e:
+                        print(f"Warning: background refresh of {tool_name} failed: {e}")
+                    finally:
+                        self._release_refresh(key)
+                threading.Thread(target=refresh, daemon=True).start()
+            return value
+        self._count(tool_name, "misses")
+        value = compute(query)
+        self.store(tool_name, query, value)
+        return value
+
+    async def aget_or_compute(self, tool_name: str, query: str, compute) -> str:
+        value, state = self.lookup(tool_name, query)
+        if state == "fresh":
+            self._count(tool_name, "hits")
+            return value
+        if state == "stale":
+            self._count(tool_name, "stale_hits")
+            key = self._key(tool_name, query)
+            if self._claim_refresh(key):
+                async def refresh():
+                    try:
+                        self.store(tool_name, query, await compute(query))
+                        self._count(tool_name, "refreshes")
+                    except Exception as e:
+                        print(f"Warning: background refresh of {tool_name} failed: {e}")
+                    finally:
+                        self._release_refresh(key)
+                task = asyncio.ensure_future(refresh())
+                # Keep a reference so the task is not garbage collected mid-flight
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+        self._count(tool_name, "misses")
+        value = await compute(query)
+        self.store(tool_name, query, value)
+        return value
+
+    def wrap(self, tool_name: str, func: Callable[[str], str]) -> Callable[[str], str]:
+        """Wrap a sync tool function with this cache"""
+        def cached(query: str) -> str:
+            return self.get_or_compute(tool_name, query, func)
+        return cached
+
+    def awrap(self, tool_name: str, coroutine):
+        """Wrap an async tool function with this cache"""
+        async def cached(query: str) -> str:
+            return await self.aget_or_compute(tool_name, query, coroutine)
+        return cached
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per tool"""
+        with self._stats_lock:
+            return {tool: dict(counters) for tool, counters in self._stats.items()}
+
+
+def create_tool_cache(config: Dict[str, Any]) -> ToolResultCache:
+    """Build the tool result cache selected by the `cache` config section"""
+    cache_config = config.get('cache', {})
+    backend_name = cache_config.get('backend', 'memory')
+    max_entries = cache_config.get('max_entries', 5000)
+    if backend_name == 'disk':
+        backend = DiskCacheBackend(cache_config.get('disk_path', 'data/tool_cache.db'), max_entries)
+    elif backend_name == 'memory':
+        backend = MemoryCacheBackend(max_entries)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend_name}")
+    return ToolResultCache(
+        backend,
+        tool_settings=cache_config.get('tools', {}),
+        default_ttl=cache_config.get('default_ttl', 300),
+        default_stale_ttl=cache_config.get('default_stale_ttl', 0),
+    )
@@ -0,0 +1,109 @@
+import re
+from typing import Dict, List, Any, Optional
+
+# Terms that put a question in scope; matched case-insensitively on word boundaries
+DEFAULT_VOCABULARY = [
+    'ai', 'artificial intelligence', 'machine learning', 'ml', 'deep learning',
+    'neural network', 'data science', 'algorithm', 'model', 'training',
+    'dataset', 'prediction', 'classification', 'clustering', 'regression',
+    'tensorflow', 'pytorch', 'keras', 'scikit-learn', 'computer vision',
+    'nlp', 'natural language processing', 'reinforcement learning',
+    'supervised learning', 'unsupervised learning', 'chatbot', 'openai',
+    'gpt', 'bert', 'transformer', 'cnn', 'rnn', 'lstm',
+    # Questions about the user's own uploads are always in scope
+    'my document', 'my file', 'uploaded'
+]
+
+# Plural/inflection suffixes accepted after any term ("models", "transformers", "gpt4")
+SUFFIX = r"(?:s|es)?\d*"
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Regex for a character trie; shared prefixes are tested once instead of once per term"""
+    branches = []
+    for char, child in sorted(node.items()):
+        if char == '':
+            continue
+        # Spaces and hyphens inside a term are interchangeable
+        prefix = r"[\s-]+" if char == ' ' else re.escape(char)
+        branches.append(prefix + _trie_pattern(child))
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return "(?:" + pattern + ")?" if '' in node else pattern
+
+
+def compile_vocabulary(vocabulary: List[str]) -> re.Pattern:
+    """One compiled regex over the whole vocabulary, matched against lowercased text.
+
+    Terms only match as whole words: 'ai' no longer matches "said" and 'ml'
+    no longer matches "html".
+    """
+    trie = {}
+    for term in vocabulary:
+        term = re.sub(r"[\s-]+", " ", term.strip().lower())
+        if not term:
+            continue
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+    return re.compile(r"\b" + _trie_pattern(trie) + SUFFIX + r"\b")
+
+
+class EmbeddingTopicScorer:
+    """Cosine similarity of a query to the centroid of on-topic example questions"""
+
+    def __init__(self, model_name: str, examples: List[str], threshold: float = 0.35):
+        if not examples:
+            raise ValueError("the embedding topic scorer needs on-topic example questions")
+        from semantic_cache import load_embedding_model
+        self.model = load_embedding_model(model_name)
+        self.threshold = threshold
+        vectors = self.model.encode(examples, normalize_embeddings=True, convert_to_numpy=True)
+        centroid = vectors.mean(axis=0)
+        self.centroid = centroid / (float((centroid ** 2).sum()) ** 0.5 or 1.0)
+
+    def score(self, query: str) -> float:
+        vector = self.model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0]
+        return float(vector @ self.centroid)
+
+    def is_related(self, query: str) -> bool:
+        return self.score(query) >= self.threshold
+
+
+class TopicFilter:
+    """Gatekeeper deciding whether a question is about AI/ML, built once at startup"""
+
+    def __init__(self, vocabulary: Optional[List[str]] = None, scorer: Optional[EmbeddingTopicScorer] = None):
+        self.pattern = compile_vocabulary(vocabulary or DEFAULT_VOCABULARY)
+        # Consulted only when no vocabulary term matches, to rescue paraphrased questions
+        self.scorer = scorer
+
+    def is_related(self, query: str) -> bool:
+        # Lowercasing once is cheaper than a case-insensitive pattern
+        if self.pattern.search(query.lower()):
+            return True
+        if self.scorer is not None:
+            try:
+                return self.scorer.is_related(query)
+            except Exception as e:
+                print(f"Warning: topic scorer failed: {e}")
+        return False
+
+
+def create_topic_filter(config: Dict[str, Any]) -> TopicFilter:
+    """Build the topic filter from the `topic_filter` config section"""
+    filter_config = config.get('topic_filter', {})
+    scorer = None
+    embedding_config = filter_config.get('embedding', {})
+    if embedding_config.get('enabled', False):
+        try:
+            scorer = EmbeddingTopicScorer(
+                embedding_config.get('model', 'sentence-transformers/all-MiniLM-L6-v2'),
+                embedding_config.get('examples', []),
+                threshold=embedding_config.get('threshold', 0.35),
+            )
+        except Exception as e:
+            print(f"Warning: Could not initialize embedding topic scorer: {e}")
+    return TopicFilter(filter_config.get('vocabulary'), scorer)